@@ -67,12 +67,22 @@ class UserProfileAdmin(admin.ModelAdmin):
         return "No back image uploaded"
     kyc_back_preview.short_description = "Back ID Preview"
     
+    def set_kyc_status(self, queryset, status):
+        # Saved one by one (not queryset.update()) so the signals record the
+        # KYC transition for the config webhooks and refresh the admin counters
+        profiles = list(queryset.select_related('user'))
+        for profile in profiles:
+            profile.kyc_status = status
+            profile.save(update_fields=['kyc_status'])
+        return profiles
+    
     @admin.action(description="✅ Approve KYC Verification")
     def approve_kyc(self, request, queryset):
-        updated_count = queryset.update(kyc_status='VERIFIED')
+        profiles = self.set_kyc_status(queryset, 'VERIFIED')
+        updated_count = len(profiles)
         
         # Send approval emails
-        for profile in queryset:
+        for profile in profiles:
             try:
                 send_mail(
                     subject='KYC Verification Approved',
@@ -89,10 +99,11 @@ class UserProfileAdmin(admin.ModelAdmin):
     
     @admin.action(description="❌ Reject KYC Verification")
     def reject_kyc(self, request, queryset):
-        updated_count = queryset.update(kyc_status='REJECTED')
+        profiles = self.set_kyc_status(queryset, 'REJECTED')
+        updated_count = len(profiles)
         
         # Send rejection emails
-        for profile in queryset:
+        for profile in profiles:
             try:
                 send_mail(
                     subject='KYC Verification Rejected',
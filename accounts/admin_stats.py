@@ -0,0 +1,61 @@
+"""
+Cached counters for the custom admin dashboard and subscription list.
+
+Each page's counters come from a single conditional-aggregate query and are
+cached for ADMIN_STATS_TTL seconds. accounts.signals drops the cache whenever
+a user, profile or AI config is saved or deleted. The TTL only has to catch
+changes that happen without a save: subscriptions running out and the day
+rolling over for "new users today".
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import CustomUser, UserProfile
+
+ADMIN_STATS_TTL = getattr(settings, 'ADMIN_STATS_TTL', 60)
+EXPIRING_SOON = timedelta(days=7)
+
+DASHBOARD_KEY = 'admin_stats:dashboard'
+SUBSCRIPTIONS_KEY = 'admin_stats:subscriptions'
+
+
+def dashboard_stats():
+    """total_users, new_users_today, pending_kyc, total_ai_agents and active_subscriptions"""
+    stats = cache.get(DASHBOARD_KEY)
+    if stats is None:
+        now = timezone.now()
+        # A range on date_joined can use an index, unlike date_joined__date
+        today = timezone.make_aware(datetime.combine(timezone.localdate(now), time.min))
+        # profile and ai_config are one-to-one, so the joins add no rows
+        stats = CustomUser.objects.aggregate(
+            total_users=Count('pk'),
+            new_users_today=Count('pk', filter=Q(date_joined__gte=today)),
+            pending_kyc=Count('profile', filter=Q(profile__kyc_status='PENDING')),
+            total_ai_agents=Count('ai_config'),
+            active_subscriptions=Count('profile', filter=Q(profile__subscription_expiry__gt=now)),
+        )
+        cache.set(DASHBOARD_KEY, stats, ADMIN_STATS_TTL)
+    return stats
+
+
+def subscription_stats():
+    """total_active, expiring_soon, total_expired and never_subscribed profile counts"""
+    stats = cache.get(SUBSCRIPTIONS_KEY)
+    if stats is None:
+        now = timezone.now()
+        stats = UserProfile.objects.aggregate(
+            total_active=Count('pk', filter=Q(subscription_expiry__gt=now)),
+            expiring_soon=Count('pk', filter=Q(subscription_expiry__gt=now, subscription_expiry__lte=now + EXPIRING_SOON)),
+            total_expired=Count('pk', filter=Q(subscription_expiry__lte=now)),
+            never_subscribed=Count('pk', filter=Q(subscription_expiry__isnull=True)),
+        )
+        cache.set(SUBSCRIPTIONS_KEY, stats, ADMIN_STATS_TTL)
+    return stats
+
+
+def invalidate_admin_stats():
+    cache.delete_many([DASHBOARD_KEY, SUBSCRIPTIONS_KEY])
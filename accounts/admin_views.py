@@ -4,7 +4,11 @@ from django.contrib import messages
 from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.paginator import Paginator
-from .models import CustomUser, UserProfile, AIAgentConfig
+from .models import CustomUser, UserProfile, email_prefix_key
+from . import http_client
+from .admin_stats import dashboard_stats, subscription_stats
+from .instrumentation import get_view_stats, reset_stats
+from .user_search import search_users
 
 # Check if user is superuser
 def is_superuser(user):
@@ -17,21 +21,18 @@ def admin_dashboard(request):
     Main Admin Dashboard View
     Displays overview statistics and recent activity.
     """
-    total_users = CustomUser.objects.count()
-    new_users_today = CustomUser.objects.filter(date_joined__date=timezone.now().date()).count()
-    pending_kyc = UserProfile.objects.filter(kyc_status='PENDING').count()
-    total_ai_agents = AIAgentConfig.objects.count()
+    stats = dashboard_stats()
     
     # Recent 5 users
     recent_users = CustomUser.objects.select_related('profile').order_by('-date_joined')[:5]
 
     context = {
-        'total_users': total_users,
-        'new_users_today': new_users_today,
-        'pending_kyc': pending_kyc,
-        'total_ai_agents': total_ai_agents,
+        'total_users': stats['total_users'],
+        'new_users_today': stats['new_users_today'],
+        'pending_kyc': stats['pending_kyc'],
+        'total_ai_agents': stats['total_ai_agents'],
         'recent_users': recent_users,
-        'active_subscriptions': UserProfile.objects.filter(subscription_expiry__gt=timezone.now()).count()
+        'active_subscriptions': stats['active_subscriptions'],
     }
     return render(request, 'custom_admin/dashboard.html', context)
 
@@ -47,13 +48,6 @@ def admin_user_list(request):
     
     users = CustomUser.objects.select_related('profile').all().order_by('-date_joined')
     
-    if query:
-        users = users.filter(
-            Q(email__icontains=query) | 
-            Q(profile__name__icontains=query) |
-            Q(profile__mobile_number__icontains=query)
-        )
-        
     if status_filter == 'active':
         users = users.filter(is_active=True)
     elif status_filter == 'inactive':
@@ -63,6 +57,18 @@ def admin_user_list(request):
     elif status_filter == 'pending':
         users = users.filter(profile__kyc_status='PENDING')
 
+    # Search: ranked from the user search index when it can answer the query
+    if query:
+        results = search_users(query, users)
+        if results is not None:
+            users = results
+        else:
+            users = users.filter(
+                Q(email__icontains=query) | 
+                Q(profile__name__icontains=query) |
+                Q(profile__mobile_number__icontains=query)
+            )
+
     # Pagination — 20 users per page
     paginator = Paginator(users, 20)
     page_number = request.GET.get('page')
@@ -113,9 +119,14 @@ def admin_user_detail(request, user_id):
                 messages.success(request, f"Subscription extended by {days} days.")
         
         elif action == 'update_info':
+             email = request.POST.get('email', user.email)
+             # Only a changed email can collide; users who lost the 0013 backfill keep a NULL prefix
+             if email != user.email and CustomUser.objects.filter(email_prefix=email_prefix_key(email)).exclude(pk=user.pk).exists():
+                 messages.error(request, "Another user already has an email with the same name before @.")
+                 return redirect('admin_user_detail', user_id=user_id)
              profile.name = request.POST.get('name', profile.name)
              profile.mobile_number = request.POST.get('mobile_number', profile.mobile_number)
-             user.email = request.POST.get('email', user.email)
+             user.email = email
              profile.save()
              user.save()
              messages.success(request, "User information updated.")
@@ -191,22 +202,8 @@ def admin_subscription_list(request):
 
     profiles = UserProfile.objects.select_related('user').all().order_by('-subscription_expiry')
 
-    # Stats
-    total_active = UserProfile.objects.filter(subscription_expiry__gt=now).count()
-    expiring_soon = UserProfile.objects.filter(
-        subscription_expiry__gt=now,
-        subscription_expiry__lte=now + timezone.timedelta(days=7)
-    ).count()
-    total_expired = UserProfile.objects.filter(subscription_expiry__lte=now).count()
-    never_subscribed = UserProfile.objects.filter(subscription_expiry__isnull=True).count()
-
-    # Search
-    if query:
-        profiles = profiles.filter(
-            Q(user__email__icontains=query) |
-            Q(name__icontains=query) |
-            Q(mobile_number__icontains=query)
-        )
+    # Stats (one cached aggregate query)
+    stats = subscription_stats()
 
     # Filter
     if status_filter == 'active':
@@ -221,6 +218,18 @@ def admin_subscription_list(request):
     elif status_filter == 'never':
         profiles = profiles.filter(subscription_expiry__isnull=True)
 
+    # Search: ranked from the user search index when it can answer the query
+    if query:
+        results = search_users(query, profiles, user_field='user_id')
+        if results is not None:
+            profiles = results
+        else:
+            profiles = profiles.filter(
+                Q(user__email__icontains=query) |
+                Q(name__icontains=query) |
+                Q(mobile_number__icontains=query)
+            )
+
     # Pagination
     paginator = Paginator(profiles, 20)
     page_number = request.GET.get('page')
@@ -253,11 +262,32 @@ def admin_subscription_list(request):
     context = {
         'profiles': page_obj,
         'page_obj': page_obj,
-        'total_active': total_active,
-        'expiring_soon': expiring_soon,
-        'total_expired': total_expired,
-        'never_subscribed': never_subscribed,
+        'total_active': stats['total_active'],
+        'expiring_soon': stats['expiring_soon'],
+        'total_expired': stats['total_expired'],
+        'never_subscribed': stats['never_subscribed'],
         'status_filter': status_filter,
         'query': query,
     }
     return render(request, 'custom_admin/subscription_list.html', context)
+
+
+@login_required
+@user_passes_test(is_superuser)
+def admin_stats(request):
+    """
+    Per-view performance stats: latency percentiles, SQL queries, outbound
+    HTTP calls and template render time (see accounts.instrumentation)
+    """
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        reset_stats()
+        messages.success(request, 'Performance stats have been reset.')
+        return redirect('admin_stats')
+
+    rows, since = get_view_stats()
+    context = {
+        'rows': rows,
+        'since': timezone.datetime.fromtimestamp(since, tz=timezone.get_current_timezone()) if since else None,
+        'hosts': sorted(http_client.get_stats().items()),
+    }
+    return render(request, 'custom_admin/stats.html', context)
@@ -1,7 +1,17 @@
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from .models import CustomUser, AIAgentConfig, UserProfile
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from .config_cache import all_fields, cached_etag, get_config_payload, get_config_payloads, is_post_blocked, is_subscription_active, remember_etag
+from .streaming import streaming_content
+import json
+
+CONFIG_FIELDS = ('fb_page_id', 'fb_page_api', 'system_prompt', 'webhook_url', 'ai_agent_status', 'block_post_ids', 'all')
+INVALID_FIELD_MESSAGE = 'Invalid field. Available fields: ' + ', '.join(CONFIG_FIELDS)
+# Prefixes resolved per cache/database round trip in the bulk endpoint
+BULK_CHUNK_SIZE = 500
+MAX_BULK_PREFIXES = 1000
 
 
 @csrf_exempt
@@ -24,76 +34,186 @@ def api_get_user_config(request, admin_password, email_prefix, field):
     if admin_password != settings.API_ADMIN_PASSWORD:
         return HttpResponse('Unauthorized', status=401)
     
+    # Conditional request: answer 304 from the cache before any database work
+    etag = cached_etag(email_prefix, field)
+    if etag is not None:
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+    
     try:
-        # Find user by email prefix
-        user = CustomUser.objects.filter(email__startswith=email_prefix + '@').first()
+        # Resolved config for the prefix, normally straight from the cache
+        config = get_config_payload(email_prefix)
         
-        if not user:
-            # Try exact match if no @ symbol
-            users = CustomUser.objects.filter(email__icontains=email_prefix)
-            if users.exists():
-                user = users.first()
-            else:
-                return HttpResponse('User not found', status=404)
+        if config is None:
+            return HttpResponse('User not found', status=404)
         
-        # Get AI config
-        try:
-            ai_config = user.ai_config
-        except AIAgentConfig.DoesNotExist:
+        if not config['configured']:
             return HttpResponse('AI configuration not found for this user', status=404)
         
         # Check subscription status — if expired, agent is effectively off
-        try:
-            profile = user.profile
-            subscription_active = profile.is_subscription_active()
-        except UserProfile.DoesNotExist:
-            subscription_active = False
+        subscription_active = is_subscription_active(config)
+        expires_at = config['subscription_expiry'] if subscription_active else None
         
-        effective_active = ai_config.is_active and subscription_active
+        effective_active = config['is_active'] and subscription_active
+        variant = 'active' if subscription_active else 'expired'
         
         # Return requested field
         if field == 'fb_page_id':
-            return HttpResponse(ai_config.facebook_page_id or '', content_type='text/plain')
+            response = HttpResponse(config['fb_page_id'], content_type='text/plain')
         
         elif field == 'system_prompt':
-            return HttpResponse(ai_config.system_prompt or '', content_type='text/plain')
+            response = HttpResponse(config['system_prompt'], content_type='text/plain')
         
         elif field == 'webhook_url':
-            return HttpResponse(ai_config.get_webhook_url(), content_type='text/plain')
+            response = HttpResponse(config['webhook_url'], content_type='text/plain')
         
         elif field == 'fb_page_api':
-            return HttpResponse(ai_config.facebook_page_api or '', content_type='text/plain')
+            response = HttpResponse(config['fb_page_api'], content_type='text/plain')
         
         elif field == 'ai_agent_status':
             status = 'on' if effective_active else 'off'
-            return JsonResponse({'status': status})
+            response = JsonResponse({'status': status})
         
         elif field == 'block_post_ids':
             # User said: "i will get all the list of block FB post ids"
-            blocked_ids = ai_config.get_blocked_post_ids_list()
-            return JsonResponse({'blocked_post_ids': blocked_ids})
+            response = JsonResponse({'blocked_post_ids': config['blocked_post_ids']})
         
         elif field == 'all':
-            blocked_ids = ai_config.get_blocked_post_ids_list()
-            data = {
-                'email': user.email,
-                'email_prefix': user.get_email_prefix(),
-                'ai_agent_status': 'on' if effective_active else 'off',
-                'is_active': effective_active,
-                'subscription_active': subscription_active,
-                'fb_page_id': ai_config.facebook_page_id or '',
-                'fb_page_api': ai_config.facebook_page_api or '',
-                'system_prompt': ai_config.system_prompt or '',
-                'webhook_url': ai_config.get_webhook_url(),
-                'blocked_post_ids': blocked_ids,
-            }
-            return JsonResponse(data)
+            # Pre-encoded when the config was saved
+            response = HttpResponse(config['snapshot'][variant], content_type='application/json')
         
         else:
-            return HttpResponse(
-                'Invalid field. Available fields: fb_page_id, fb_page_api, system_prompt, webhook_url, ai_agent_status, block_post_ids, all',
-                status=400
-            )
+            return HttpResponse(INVALID_FIELD_MESSAGE, status=400)
+        
+        # The config version identifies the body until the next save or expiry
+        etag = quote_etag(f"{config['version']}-{variant}")
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        remember_etag(email_prefix, field, etag, config['user_id'], config['version'], expires_at)
+        return response
     
     except Exception as e:
         return HttpResponse(f'Error: {str(e)}', status=500)
+
+
+@csrf_exempt
+def api_is_post_blocked(request, admin_password, email_prefix, post_id):
+    """
+    Public API endpoint checking whether one Facebook post is blocked
+    URL: /api/user/{admin_password}/{email_prefix}/is_blocked/{post_id}
+    
+    Returns {"post_id": ..., "blocked": true|false} without downloading the
+    whole block list.
+    """
+    
+    # Verify admin password
+    if admin_password != settings.API_ADMIN_PASSWORD:
+        return HttpResponse('Unauthorized', status=401)
+    
+    blocked = is_post_blocked(email_prefix, post_id)
+    if blocked is None:
+        return HttpResponse('User or AI configuration not found', status=404)
+    
+    response = JsonResponse({'post_id': post_id, 'blocked': blocked})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _bulk_entry(prefix, config, fields):
+    """One tenant's requested fields for the bulk endpoint."""
+    if config is None:
+        return {'prefix': prefix, 'error': 'User not found'}
+    if not config['configured']:
+        return {'prefix': prefix, 'error': 'AI configuration not found for this user'}
+    
+    subscription_active = is_subscription_active(config)
+    effective_active = config['is_active'] and subscription_active
+    entry = {'prefix': prefix}
+    for field in fields:
+        if field == 'ai_agent_status':
+            entry[field] = 'on' if effective_active else 'off'
+        elif field == 'block_post_ids':
+            entry[field] = config['blocked_post_ids']
+        elif field == 'all':
+            entry[field] = all_fields(config, subscription_active)
+        else:
+            entry[field] = config[field]
+    return entry
+
+
+def _bulk_entries(prefixes, fields):
+    for start in range(0, len(prefixes), BULK_CHUNK_SIZE):
+        chunk = prefixes[start:start + BULK_CHUNK_SIZE]
+        configs = get_config_payloads(chunk)
+        for prefix in chunk:
+            yield _bulk_entry(prefix, configs[prefix], fields)
+
+
+def _split_list(value):
+    """Comma-separated string or list of strings -> stripped non-empty items; ValueError otherwise"""
+    if isinstance(value, str):
+        value = value.split(',')
+    elif not isinstance(value, list):
+        raise ValueError
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+
+@csrf_exempt
+def api_get_bulk_config(request, admin_password):
+    """
+    Bulk API endpoint returning the configuration of many users in one call
+    URL: /api/users/{admin_password}/
+    
+    GET  ?prefixes=alice,bob&fields=ai_agent_status,block_post_ids
+    POST {"prefixes": ["alice", "bob"], "fields": ["ai_agent_status", "block_post_ids"]}
+    
+    Fields are the same as for api_get_user_config (default: all). Returns
+    {"configs": [{"prefix": ..., <field>: ...}, ...]} in request order, with an
+    "error" entry for unknown users. With ?format=ndjson (or Accept:
+    application/x-ndjson) one JSON object per line is streamed instead, and
+    the prefix limit does not apply.
+    """
+    
+    # Verify admin password
+    if admin_password != settings.API_ADMIN_PASSWORD:
+        return HttpResponse('Unauthorized', status=401)
+    
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            return HttpResponse('Invalid JSON body', status=400)
+        if not isinstance(body, dict):
+            return HttpResponse('Invalid JSON body', status=400)
+        try:
+            prefixes = _split_list(body.get('prefixes', []))
+            fields = _split_list(body.get('fields', []))
+        except ValueError:
+            return HttpResponse('prefixes and fields must be a list or a comma-separated string', status=400)
+    else:
+        prefixes = _split_list(request.GET.get('prefixes', ''))
+        fields = _split_list(request.GET.get('fields', ''))
+    
+    prefixes = list(dict.fromkeys(prefixes))
+    fields = fields or ['all']
+    if not prefixes:
+        return HttpResponse('No prefixes given', status=400)
+    if any(field not in CONFIG_FIELDS for field in fields):
+        return HttpResponse(INVALID_FIELD_MESSAGE, status=400)
+    
+    ndjson = (
+        request.GET.get('format') == 'ndjson'
+        or 'application/x-ndjson' in request.headers.get('Accept', '')
+    )
+    if ndjson:
+        lines = (json.dumps(entry) + '\n' for entry in _bulk_entries(prefixes, fields))
+        response = StreamingHttpResponse(streaming_content(request, lines), content_type='application/x-ndjson')
+    else:
+        if len(prefixes) > MAX_BULK_PREFIXES:
+            return HttpResponse(f'Too many prefixes (max {MAX_BULK_PREFIXES}); use format=ndjson', status=400)
+        response = JsonResponse({'configs': list(_bulk_entries(prefixes, fields))})
+    
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
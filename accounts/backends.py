@@ -0,0 +1,40 @@
+"""
+Authentication backend loading each request's identity in one query.
+
+request.user is fetched together with its profile and AI config, so the
+middleware and views read request.user.profile / request.user.ai_config (or
+CustomUser.get_profile() / get_ai_config()) without further queries.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from .models import CustomUser
+
+
+def identity_queryset():
+    return CustomUser._default_manager.select_related('profile', 'ai_config')
+
+
+class IdentityBackend(ModelBackend):
+    """ModelBackend whose get_user() also loads profile and ai_config"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # Stop here: ModelBackend (kept for old sessions) would only hash the same password again
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        try:
+            user = identity_queryset().get(pk=user_id)
+        except CustomUser.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await identity_queryset().aget(pk=user_id)
+        except CustomUser.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,264 @@
+"""
+Version tokens, resolved payloads and validators for the public config API.
+
+Every save of a user's CustomUser, UserProfile or AIAgentConfig gives that
+user a new config version (see accounts.signals). Entries cached under an
+email prefix record the version they were built from and are ignored once
+it changes:
+
+- get_config_payload() keeps the fully resolved config of a prefix (page ID,
+  token, prompt, blocked post IDs, on/off switch and subscription expiry), so
+  api_get_user_config normally answers without a database query
+- each payload carries its ``all`` response pre-encoded as JSON bytes, in an
+  active and an expired-subscription variant; the signals rebuild the payload
+  after every save, so the hot path never encodes JSON or touches the ORM
+- remember_etag()/cached_etag() keep the ETag served for each prefix and
+  field, so a conditional request can be answered with 304 Not Modified
+- is_post_blocked() keeps each tenant's blocked post IDs as a frozenset in
+  process memory, so a membership check costs one version lookup
+
+Subscription expiry is stored as a timestamp and checked on every read, so
+an agent turns off when the subscription runs out without any save.
+"""
+import json
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import AIAgentConfig, CustomUser, UserProfile
+
+VERSION_KEY = 'config_version:{user_id}'
+# Version tokens expire like everything else in the cache; a missing token is
+# simply replaced by a new one, which invalidates the user's cached entries
+VERSION_TIMEOUT = 30 * 24 * 60 * 60
+ETAG_KEY = 'config_etag:{prefix}:{field}'
+ETAG_TIMEOUT = 24 * 60 * 60
+PAYLOAD_KEY = 'config_payload:{prefix}'
+PAYLOAD_TIMEOUT = 24 * 60 * 60
+# Tenants whose blocked post sets are kept in process memory
+BLOCKED_SETS_MAX = 1024
+
+_blocked_sets = {}
+_blocked_sets_lock = threading.Lock()
+
+
+def get_config_version(user_id):
+    """Current config version token of a user, creating one if needed."""
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump_config_version(user_id):
+    """Invalidate everything cached for a user's config."""
+    cache.set(VERSION_KEY.format(user_id=user_id), uuid.uuid4().hex, VERSION_TIMEOUT)
+
+
+def remember_etag(prefix, field, etag, user_id, version, expires_at=None):
+    """
+    Record the ETag served for prefix/field. expires_at (a UNIX timestamp) is
+    when the response stops being valid on its own, e.g. when an active
+    subscription runs out and ai_agent_status flips to off.
+    """
+    cache.set(
+        ETAG_KEY.format(prefix=prefix, field=field),
+        (etag, user_id, version, expires_at),
+        ETAG_TIMEOUT,
+    )
+
+
+def cached_etag(prefix, field):
+    """The ETag last served for prefix/field if it is still current, else None."""
+    entry = cache.get(ETAG_KEY.format(prefix=prefix, field=field))
+    if entry is None:
+        return None
+    etag, user_id, version, expires_at = entry
+    if expires_at is not None and time.time() >= expires_at:
+        return None
+    if cache.get(VERSION_KEY.format(user_id=user_id)) != version:
+        return None
+    return etag
+
+
+def _build_payload(user, version):
+    payload = {
+        'user_id': user.pk,
+        'version': version,
+        'email': user.email,
+        'email_prefix': user.get_email_prefix(),
+        'configured': False,
+        'has_profile': False,
+        'subscription_expiry': None,
+    }
+    try:
+        profile = user.profile
+        payload['has_profile'] = True
+        if profile.subscription_expiry:
+            payload['subscription_expiry'] = profile.subscription_expiry.timestamp()
+    except UserProfile.DoesNotExist:
+        pass
+
+    try:
+        ai_config = user.ai_config
+    except AIAgentConfig.DoesNotExist:
+        return payload
+
+    payload.update({
+        'configured': True,
+        'is_active': ai_config.is_active,
+        'fb_page_id': ai_config.facebook_page_id or '',
+        'fb_page_api': ai_config.facebook_page_api or '',
+        'system_prompt': ai_config.system_prompt or '',
+        'webhook_url': ai_config.get_webhook_url(),
+        'blocked_post_ids': ai_config.get_blocked_post_ids_list(),
+    })
+    payload['snapshot'] = {
+        'active': json.dumps(all_fields(payload, True)).encode(),
+        'expired': json.dumps(all_fields(payload, False)).encode(),
+    }
+    return payload
+
+
+def all_fields(payload, subscription_active):
+    """The ``all`` field of the config API for a payload and subscription state."""
+    effective_active = payload['is_active'] and subscription_active
+    return {
+        'email': payload['email'],
+        'email_prefix': payload['email_prefix'],
+        'ai_agent_status': 'on' if effective_active else 'off',
+        'is_active': effective_active,
+        'subscription_active': subscription_active,
+        'fb_page_id': payload['fb_page_id'],
+        'fb_page_api': payload['fb_page_api'],
+        'system_prompt': payload['system_prompt'],
+        'webhook_url': payload['webhook_url'],
+        'blocked_post_ids': payload['blocked_post_ids'],
+    }
+
+
+def _resolve_user_ids(prefixes):
+    """Map each prefix to a user ID with one query, like CustomUser.objects.get_by_email_prefix()."""
+    rows = CustomUser.objects.filter(
+        Q(email_prefix__in={prefix.lower() for prefix in prefixes}) | Q(email__in=prefixes)
+    ).values_list('pk', 'email_prefix', 'email')
+    by_prefix, by_email = {}, {}
+    for user_id, email_prefix, email in rows:
+        by_prefix[email_prefix] = user_id
+        by_email[email] = user_id
+
+    user_ids = {}
+    for prefix in prefixes:
+        matches = [user_id for user_id in (by_prefix.get(prefix.lower()), by_email.get(prefix)) if user_id is not None]
+        if matches:
+            user_ids[prefix] = min(matches)
+    return user_ids
+
+
+def _load_payloads(prefixes):
+    user_ids = _resolve_user_ids(prefixes)
+    if not user_ids:
+        return {}
+
+    # Read before loading the configs so a concurrent save invalidates these entries
+    version_keys = {VERSION_KEY.format(user_id=user_id): user_id for user_id in set(user_ids.values())}
+    versions = {version_keys[key]: version for key, version in cache.get_many(version_keys).items()}
+    for user_id in version_keys.values():
+        if user_id not in versions:
+            versions[user_id] = get_config_version(user_id)
+
+    users = CustomUser.objects.select_related('profile', 'ai_config').prefetch_related('ai_config__blocked_posts').in_bulk(versions)
+    payloads = {}
+    for prefix, user_id in user_ids.items():
+        if user_id in users:
+            payloads[prefix] = _build_payload(users[user_id], versions[user_id])
+
+    cache.set_many(
+        {PAYLOAD_KEY.format(prefix=prefix.lower()): payload for prefix, payload in payloads.items()},
+        PAYLOAD_TIMEOUT,
+    )
+    return payloads
+
+
+def get_config_payloads(prefixes):
+    """
+    The resolved configs of many email prefixes: a dict of prefix -> payload,
+    or None for prefixes without a user. Cached payloads are checked against
+    the users' config versions in two cache round trips; all the others are
+    loaded together with one ID query and one select_related query.
+    """
+    # Prefix lookups are case-insensitive, so are the cache keys; one key can
+    # serve several spellings of the same prefix
+    keys = {}
+    for prefix in prefixes:
+        keys.setdefault(PAYLOAD_KEY.format(prefix=prefix.lower()), []).append(prefix)
+    cached = cache.get_many(keys)
+    versions = cache.get_many({VERSION_KEY.format(user_id=payload['user_id']) for payload in cached.values()})
+
+    payloads = {}
+    for key, payload in cached.items():
+        if versions.get(VERSION_KEY.format(user_id=payload['user_id'])) == payload['version']:
+            for prefix in keys[key]:
+                payloads[prefix] = payload
+
+    missing = list(dict.fromkeys(prefix for prefix in prefixes if prefix not in payloads))
+    if missing:
+        payloads.update(_load_payloads(missing))
+    return {prefix: payloads.get(prefix) for prefix in prefixes}
+
+
+def get_config_payload(prefix):
+    """
+    The resolved config of the user with this email prefix, or None if there
+    is no such user. Served from the cache while the user's config version is
+    unchanged; otherwise loaded with one select_related query and cached.
+    """
+    return get_config_payloads([prefix])[prefix]
+
+
+def refresh_config_payload(user_id):
+    """Rebuild and cache a user's payload (and snapshots) after their config changed."""
+    version = get_config_version(user_id)
+    user = CustomUser.objects.select_related('profile', 'ai_config').prefetch_related('ai_config__blocked_posts').filter(pk=user_id).first()
+    if user is None or not user.email_prefix:
+        return
+    cache.set(PAYLOAD_KEY.format(prefix=user.email_prefix), _build_payload(user, version), PAYLOAD_TIMEOUT)
+
+
+def is_subscription_active(payload):
+    """UserProfile.is_subscription_active() evaluated against a cached payload."""
+    if not payload['has_profile']:
+        return False
+    expiry = payload['subscription_expiry']
+    return expiry is None or time.time() < expiry
+
+
+def is_post_blocked(prefix, post_id):
+    """
+    Whether post_id is blocked for the user with this email prefix, or None
+    if there is no such user or they have no AI configuration. The blocked
+    IDs are held as a frozenset per prefix and reused while the user's config
+    version is unchanged.
+    """
+    key = prefix.lower()
+    entry = _blocked_sets.get(key)
+    if entry is not None:
+        user_id, version, blocked = entry
+        if cache.get(VERSION_KEY.format(user_id=user_id)) == version:
+            return post_id in blocked
+
+    payload = get_config_payload(prefix)
+    if payload is None or not payload['configured']:
+        return None
+    blocked = frozenset(payload['blocked_post_ids'])
+    with _blocked_sets_lock:
+        _blocked_sets.pop(key, None)
+        if len(_blocked_sets) >= BLOCKED_SETS_MAX:
+            _blocked_sets.pop(next(iter(_blocked_sets)))
+        _blocked_sets[key] = (payload['user_id'], payload['version'], blocked)
+    return post_id in blocked
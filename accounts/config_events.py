@@ -0,0 +1,248 @@
+"""
+Transactional outbox for config change webhooks.
+
+Instead of the automation layer polling /api/user/.../all, changes are
+announced to CONFIG_WEBHOOK_URL:
+
+- record_event() stores a ConfigEvent in the same transaction as the change
+  that caused it (AIAgentConfig and blocked post saves, KYC and subscription
+  transitions; see accounts.signals), so an event exists exactly when the
+  change was committed. Those models save through AtomicSaveModel, which
+  runs the post_save handlers inside the save's transaction; deletes send
+  post_delete inside the deletion's transaction already
+- record_expired_subscriptions() adds an event for every subscription that
+  ran out since the previous scan, as expiry happens without any save; the
+  scan watermark is stored in the database (ConfigEventState) together with
+  the events
+- dispatch_events() POSTs pending events in batches, each with the user's
+  current config (the ``all`` field of the config API), and retries failed
+  batches with exponential backoff
+
+Frequent config_changed events are deduplicated: a user has at most one
+pending config_changed event, and events sharing a dedup key within a batch
+are sent once. Delivery is at least once, so consumers should use the event
+``id`` to drop repeats. Only one dispatcher runs at a time: it holds a lease
+on the ConfigEventState row (acquire_dispatch_lease()), taken with a
+conditional UPDATE so it works on every database.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+import requests
+
+from . import http_client
+from .config_cache import all_fields, get_config_payloads, is_subscription_active
+from .models import ConfigEvent, ConfigEventState, UserProfile
+
+logger = logging.getLogger(__name__)
+
+CONFIG_WEBHOOK_URL = getattr(settings, 'CONFIG_WEBHOOK_URL', '')
+CONFIG_WEBHOOK_SECRET = getattr(settings, 'CONFIG_WEBHOOK_SECRET', '')
+WEBHOOK_TIMEOUT = (5, 30)
+
+MAX_ATTEMPTS = 10
+RETRY_BASE = timedelta(seconds=30)
+RETRY_MAX = timedelta(hours=1)
+# Events stuck in 'sending' this long (dispatcher crashed) are picked up again
+SENDING_LEASE = timedelta(minutes=5)
+SENT_RETENTION = timedelta(days=7)
+
+STATE_ID = 1
+# How far back the first expiry scan looks
+EXPIRY_SCAN_LOOKBACK = timedelta(days=1)
+
+
+def webhooks_enabled():
+    return bool(CONFIG_WEBHOOK_URL)
+
+
+def _new_event(user, event_type, data=None, dedup_key=None):
+    return ConfigEvent(
+        user=user,
+        email_prefix=user.get_email_prefix(),
+        event_type=event_type,
+        data=data or {},
+        dedup_key=dedup_key,
+    )
+
+
+def record_event(user, event_type, data=None, dedup_key=None):
+    """
+    Add an event to the outbox, unless a pending event with the same
+    dedup_key is already waiting. Does nothing while webhooks are disabled.
+    """
+    if not webhooks_enabled():
+        return
+    # The partial unique constraint turns a duplicate pending event into a no-op
+    ConfigEvent.objects.bulk_create([_new_event(user, event_type, data, dedup_key)], ignore_conflicts=True)
+
+
+def record_config_changed(user):
+    record_event(user, 'config_changed', dedup_key=f'config_changed:{user.pk}')
+
+
+def _get_state():
+    state, _ = ConfigEventState.objects.get_or_create(pk=STATE_ID)
+    return state
+
+
+def acquire_dispatch_lease(owner, duration):
+    """
+    Take (or renew) the dispatcher lease for duration. Returns False while
+    another owner holds an unexpired lease.
+    """
+    _get_state()
+    now = timezone.now()
+    taken = ConfigEventState.objects.filter(pk=STATE_ID).filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lte=now) | Q(lock_owner=owner)
+    ).update(lock_owner=owner, locked_until=now + duration)
+    return taken == 1
+
+
+def release_dispatch_lease(owner):
+    ConfigEventState.objects.filter(pk=STATE_ID, lock_owner=owner).update(lock_owner='', locked_until=None)
+
+
+def record_expired_subscriptions(now=None):
+    """Record a subscription_expired event for every expiry since the last scan. Returns the count."""
+    if not webhooks_enabled():
+        return 0
+    now = now or timezone.now()
+    state = _get_state()
+    since = state.expiry_scanned_at or now - EXPIRY_SCAN_LOOKBACK
+
+    profiles = UserProfile.objects.filter(
+        subscription_expiry__gt=since,
+        subscription_expiry__lte=now,
+    ).select_related('user')
+    events = [
+        _new_event(
+            profile.user,
+            'subscription_expired',
+            {'subscription_expiry': profile.subscription_expiry.isoformat()},
+            f'subscription_expired:{profile.user_id}:{int(profile.subscription_expiry.timestamp())}',
+        )
+        for profile in profiles
+    ]
+    with transaction.atomic():
+        ConfigEvent.objects.bulk_create(events, ignore_conflicts=True)
+        ConfigEventState.objects.filter(pk=STATE_ID).update(expiry_scanned_at=now)
+    return len(events)
+
+
+def _claim_batch(batch_size, now):
+    """Mark up to batch_size due events as sending and return them."""
+    due = (
+        ConfigEvent.objects.filter(status__in=('pending', 'retry'), next_attempt_at__lte=now)
+        | ConfigEvent.objects.filter(status='sending', next_attempt_at__lte=now)
+    )
+    ids = list(due.order_by('id').values_list('id', flat=True)[:batch_size])
+    ConfigEvent.objects.filter(id__in=ids).update(status='sending', next_attempt_at=now + SENDING_LEASE)
+    return list(ConfigEvent.objects.filter(id__in=ids).order_by('id'))
+
+
+def _coalesce(events):
+    """Drop all but the latest event of each dedup key."""
+    latest = {}
+    for event in events:
+        latest[event.dedup_key or f'id:{event.pk}'] = event
+    return sorted(latest.values(), key=lambda event: event.pk)
+
+
+def _event_body(event, config):
+    body = {
+        'id': event.pk,
+        'type': event.event_type,
+        'email_prefix': event.email_prefix,
+        'occurred_at': event.created_at.isoformat(),
+        'data': event.data,
+        'config': None,
+    }
+    if config is not None and config['configured']:
+        body['config'] = all_fields(config, is_subscription_active(config))
+    return body
+
+
+def _sign(body):
+    return 'sha256=' + hmac.new(CONFIG_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _post_events(events):
+    """POST one batch. Returns None on success, else an error message."""
+    configs = get_config_payloads(list({event.email_prefix for event in events}))
+    body = json.dumps({
+        'events': [_event_body(event, configs[event.email_prefix]) for event in events],
+    }).encode()
+    headers = {'Content-Type': 'application/json'}
+    if CONFIG_WEBHOOK_SECRET:
+        headers['X-Signature-256'] = _sign(body)
+
+    try:
+        response = http_client.post(CONFIG_WEBHOOK_URL, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT)
+    except requests.RequestException as e:
+        return str(e)
+    if not 200 <= response.status_code < 300:
+        return f'HTTP {response.status_code}: {response.text[:200]}'
+    return None
+
+
+def _retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def dispatch_batch(batch_size=100):
+    """
+    Send one batch of due events. Returns (sent, failed) event counts, or
+    None when nothing was due.
+    """
+    now = timezone.now()
+    events = _claim_batch(batch_size, now)
+    if not events:
+        return None
+
+    error = _post_events(_coalesce(events))
+    if error is None:
+        ConfigEvent.objects.filter(id__in=[event.pk for event in events]).update(
+            status='sent', sent_at=timezone.now(), last_error='',
+        )
+        return len(events), 0
+
+    logger.warning(f'Config webhook delivery of {len(events)} events failed: {error}')
+    for event in events:
+        event.attempts += 1
+        event.last_error = error
+        if event.attempts >= MAX_ATTEMPTS:
+            event.status = 'failed'
+        else:
+            event.status = 'retry'
+            event.next_attempt_at = now + _retry_delay(event.attempts)
+    ConfigEvent.objects.bulk_update(events, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+    return 0, len(events)
+
+
+def dispatch_events(batch_size=100):
+    """Send every due event, stopping at the first failed batch. Returns (sent, failed)."""
+    sent = failed = 0
+    while True:
+        result = dispatch_batch(batch_size)
+        if result is None:
+            break
+        sent += result[0]
+        failed += result[1]
+        if result[1]:
+            break
+    return sent, failed
+
+
+def purge_sent_events(now=None):
+    """Delete events delivered more than SENT_RETENTION ago. Returns the count."""
+    now = now or timezone.now()
+    deleted, _ = ConfigEvent.objects.filter(status='sent', sent_at__lt=now - SENT_RETENTION).delete()
+    return deleted
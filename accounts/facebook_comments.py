@@ -0,0 +1,107 @@
+"""
+Bulk Facebook comment deletion through Graph API batch requests.
+
+Comment IDs are split into batches of GRAPH_BATCH_SIZE (Graph's limit of 50
+operations per batch call). The batches are sent concurrently by a shared
+worker pool of GRAPH_BATCH_WORKERS threads, so even a spam wave of hundreds
+of comments costs only a few round trips and never more than a fixed number
+of simultaneous Graph connections. Results are reported per comment ID.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import re
+
+from django.conf import settings
+import requests
+
+from . import http_client
+from .facebook_feed import GRAPH_API_URL, graph_error_message
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BATCH_SIZE = 50
+GRAPH_BATCH_WORKERS = getattr(settings, 'GRAPH_BATCH_WORKERS', 4)
+MAX_BULK_DELETE = getattr(settings, 'MAX_BULK_DELETE', 1000)
+
+COMMENT_ID_RE = re.compile(r'^[0-9]+(_[0-9]+)?$')
+
+_executor = ThreadPoolExecutor(max_workers=GRAPH_BATCH_WORKERS, thread_name_prefix='graph-batch')
+
+
+def parse_comment_ids(text):
+    """Split pasted comment IDs on whitespace/commas, dropping duplicates but keeping order."""
+    return list(dict.fromkeys(part for part in re.split(r'[\s,]+', text) if part))
+
+
+def _batch_item_error(item):
+    if not isinstance(item, dict):
+        # Graph returns null for operations it did not get to before timing out
+        return 'Not processed by Facebook, please retry'
+    try:
+        body = json.loads(item.get('body') or '{}')
+    except ValueError:
+        body = {}
+    error = body.get('error') if isinstance(body, dict) else None
+    return error.get('message', 'Unknown error') if isinstance(error, dict) else 'Unknown error'
+
+
+def _delete_batch(comment_ids, access_token):
+    batch = [{'method': 'DELETE', 'relative_url': comment_id} for comment_id in comment_ids]
+    try:
+        response = http_client.post(
+            f"{GRAPH_API_URL}/",
+            data={
+                'access_token': access_token,
+                'batch': json.dumps(batch),
+                'include_headers': 'false',
+            },
+        )
+    except requests.RequestException as e:
+        logger.warning(f'Graph batch delete failed: {e}')
+        return {comment_id: str(e) for comment_id in comment_ids}
+
+    if response.status_code != 200:
+        error = graph_error_message(response, 'Batch request failed')
+        return {comment_id: error for comment_id in comment_ids}
+
+    try:
+        items = response.json()
+    except ValueError:
+        items = None
+    # One result per operation, in order; anything else (an HTML error page,
+    # a top-level error object) leaves the outcome of every delete unknown
+    if not isinstance(items, list) or len(items) != len(comment_ids):
+        logger.warning(f'Unexpected Graph batch response: {response.text[:200]}')
+        error = 'Unexpected response from Facebook, please retry'
+        if isinstance(items, dict):
+            error = graph_error_message(response, error)
+        return {comment_id: error for comment_id in comment_ids}
+
+    errors = {}
+    for comment_id, item in zip(comment_ids, items):
+        if not isinstance(item, dict) or item.get('code') != 200:
+            errors[comment_id] = _batch_item_error(item)
+        else:
+            errors[comment_id] = None
+    return errors
+
+
+def delete_comments(comment_ids, access_token):
+    """Delete comments through Graph batch calls.
+
+    Returns one ``{'id', 'deleted', 'error'}`` dict per comment ID, in input
+    order. IDs that are not valid comment IDs are never sent.
+    """
+    valid = [comment_id for comment_id in comment_ids if COMMENT_ID_RE.match(comment_id)]
+    batches = [valid[i:i + GRAPH_BATCH_SIZE] for i in range(0, len(valid), GRAPH_BATCH_SIZE)]
+
+    errors = {}
+    for batch_errors in _executor.map(lambda batch: _delete_batch(batch, access_token), batches):
+        errors.update(batch_errors)
+
+    results = []
+    for comment_id in comment_ids:
+        error = errors[comment_id] if comment_id in errors else 'Invalid comment ID'
+        results.append({'id': comment_id, 'deleted': error is None, 'error': error})
+    return results
@@ -0,0 +1,182 @@
+"""
+Facebook Page feed loading for the feed page.
+
+The page name and the first page of posts are requested together using Graph
+API field expansion (``?fields=name,feed.limit(N){...}``), so a feed load
+costs a single round trip instead of two sequential ones.
+
+Loaded feeds are kept in the Django cache per page (and access token):
+
+- for FEED_CACHE_TTL seconds the cached feed is served as is
+- for a further FEED_CACHE_STALE seconds it is still served, while one
+  background thread refreshes it from Graph (stale-while-revalidate)
+- page names are cached separately for PAGE_NAME_CACHE_TTL seconds and only
+  requested from Graph when missing
+
+create_post_view calls invalidate_page_feed() after publishing so the new
+post shows up on the next visit.
+
+Older posts are loaded on demand, one Graph page at a time, by following the
+``after`` paging cursor (get_feed_page()); each cursor page is cached too.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+GRAPH_API_URL = getattr(settings, 'GRAPH_API_BASE', 'https://graph.facebook.com/v24.0').rstrip('/')
+POST_FIELDS = 'id,message,created_time,full_picture,permalink_url'
+FEED_PAGE_SIZE = 25
+
+FEED_CACHE_TTL = getattr(settings, 'FEED_CACHE_TTL', 60)
+FEED_CACHE_STALE = getattr(settings, 'FEED_CACHE_STALE', 600)
+PAGE_NAME_CACHE_TTL = getattr(settings, 'PAGE_NAME_CACHE_TTL', 24 * 60 * 60)
+# Upper bound on a background refresh; the lock expires even if it hangs
+REFRESH_LOCK_TIMEOUT = 30
+
+
+class GraphError(Exception):
+    """A Graph API call returned an error response."""
+
+
+def graph_error_message(response, default='Unknown error'):
+    """The error message from a Graph API error response, or default."""
+    try:
+        return response.json().get('error', {}).get('message', default)
+    except ValueError:
+        return default
+
+
+def fetch_page_feed(page_id, access_token, limit=FEED_PAGE_SIZE, include_name=True):
+    """Fetch a page's name and its newest posts in one Graph API call.
+
+    Returns a dict with ``name``, ``posts`` and the Graph ``paging`` block
+    (``name`` is None when include_name is False).
+    Raises GraphError if Graph rejects the request.
+    """
+    fields = f'feed.limit({limit}){{{POST_FIELDS}}}'
+    if include_name:
+        fields = f'name,{fields}'
+    response = http_client.get(
+        f"{GRAPH_API_URL}/{page_id}",
+        params={'fields': fields, 'access_token': access_token},
+    )
+    if response.status_code != 200:
+        raise GraphError(graph_error_message(response, 'Failed to fetch feed.'))
+
+    data = response.json()
+    # Graph omits the feed edge entirely when the page has no posts
+    feed = data.get('feed', {})
+    return {
+        'name': data.get('name', 'Unknown Page') if include_name else None,
+        'posts': feed.get('data', []),
+        'paging': feed.get('paging', {}),
+    }
+
+
+def next_cursor(paging):
+    """The ``after`` cursor of the next (older) page of posts, or None on the last page."""
+    if not paging.get('next'):
+        return None
+    return paging.get('cursors', {}).get('after')
+
+
+def fetch_feed_page(page_id, access_token, after, limit=FEED_PAGE_SIZE):
+    """Fetch the page of posts following the ``after`` cursor.
+
+    Returns a dict with ``posts`` and the Graph ``paging`` block.
+    Raises GraphError if Graph rejects the request.
+    """
+    response = http_client.get(
+        f"{GRAPH_API_URL}/{page_id}/feed",
+        params={
+            'fields': POST_FIELDS,
+            'limit': limit,
+            'after': after,
+            'access_token': access_token,
+        },
+    )
+    if response.status_code != 200:
+        raise GraphError(graph_error_message(response, 'Failed to fetch feed.'))
+
+    data = response.json()
+    return {
+        'posts': data.get('data', []),
+        'paging': data.get('paging', {}),
+    }
+
+
+def _feed_key(page_id, access_token):
+    # The token is part of the key so a page ID alone never reads another user's feed
+    digest = hashlib.sha1(access_token.encode()).hexdigest()[:16]
+    return f'fb_feed:{page_id}:{digest}'
+
+
+def _name_key(page_id):
+    return f'fb_page_name:{page_id}'
+
+
+def _load_page_feed(page_id, access_token):
+    name = cache.get(_name_key(page_id))
+    feed = fetch_page_feed(page_id, access_token, include_name=name is None)
+    if name is None:
+        name = feed['name']
+        cache.set(_name_key(page_id), name, PAGE_NAME_CACHE_TTL)
+    feed['name'] = name
+
+    entry = {'fetched_at': time.time(), 'feed': feed}
+    cache.set(_feed_key(page_id, access_token), entry, FEED_CACHE_TTL + FEED_CACHE_STALE)
+    return feed
+
+
+def _refresh_page_feed(page_id, access_token, lock_key):
+    try:
+        _load_page_feed(page_id, access_token)
+    except Exception as e:
+        logger.warning(f'Background feed refresh failed for page {page_id}: {e}')
+    finally:
+        cache.delete(lock_key)
+
+
+def get_page_feed(page_id, access_token):
+    """The page's name and newest posts, from the cache when possible.
+
+    Only a cold cache waits on Graph; a stale entry is returned immediately
+    and refreshed in the background. Raises GraphError on a failed cold load.
+    """
+    key = _feed_key(page_id, access_token)
+    entry = cache.get(key)
+    if entry is None:
+        return _load_page_feed(page_id, access_token)
+
+    if time.time() - entry['fetched_at'] >= FEED_CACHE_TTL:
+        lock_key = f'{key}:refreshing'
+        # cache.add is atomic, so only one request starts the refresh
+        if cache.add(lock_key, True, REFRESH_LOCK_TIMEOUT):
+            threading.Thread(
+                target=_refresh_page_feed, args=(page_id, access_token, lock_key), daemon=True,
+            ).start()
+    return entry['feed']
+
+
+def get_feed_page(page_id, access_token, after):
+    """The page of posts following the ``after`` cursor, from the cache when possible."""
+    digest = hashlib.sha1(after.encode()).hexdigest()[:16]
+    key = f'{_feed_key(page_id, access_token)}:after:{digest}'
+    page = cache.get(key)
+    if page is None:
+        page = fetch_feed_page(page_id, access_token, after)
+        cache.set(key, page, FEED_CACHE_TTL + FEED_CACHE_STALE)
+    return page
+
+
+def invalidate_page_feed(page_id, access_token):
+    """Drop the cached feed of a page, e.g. after publishing to it."""
+    cache.delete(_feed_key(page_id, access_token))
@@ -125,7 +125,7 @@ class AIAgentConfigForm(forms.ModelForm):
     
     class Meta:
         model = AIAgentConfig
-        fields = ['is_active', 'facebook_page_id', 'facebook_page_api', 'system_prompt', 'blocked_post_ids']
+        fields = ['is_active', 'facebook_page_id', 'facebook_page_api', 'system_prompt']
         widgets = {
             # is_active widget is defined above to override field properties
             'facebook_page_id': forms.TextInput(attrs={
@@ -143,5 +143,4 @@ class AIAgentConfigForm(forms.ModelForm):
                 'placeholder': 'Enter your AI system prompt',
                 'rows': 6
             }),
-            'blocked_post_ids': forms.HiddenInput()
         }
@@ -0,0 +1,33 @@
+"""
+Helpers shared by the SQLite FTS5 indexes with the trigram tokenizer
+(accounts.report_search and accounts.user_search).
+"""
+from django.db import connection
+
+# The trigram tokenizer cannot MATCH terms shorter than this
+MIN_TRIGRAM_LENGTH = 3
+# Escape clause for LIKE patterns built with like_contains()
+LIKE_ESCAPE = "ESCAPE '\\'"
+
+_available_tables = {}
+
+
+def table_available(table):
+    """Whether an FTS5 table exists in the default database (SQLite only)."""
+    if table not in _available_tables:
+        _available_tables[table] = (
+            connection.vendor == 'sqlite'
+            and table in connection.introspection.table_names()
+        )
+    return _available_tables[table]
+
+
+def quote(term):
+    """term as an FTS5 string, matched literally."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_contains(term):
+    """LIKE pattern matching term anywhere, for use with LIKE_ESCAPE."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
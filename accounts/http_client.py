@@ -0,0 +1,135 @@
+"""
+Shared outbound HTTP client for Google Sheets and Facebook Graph API calls.
+
+All outbound requests go through one requests.Session with a connection pool
+per host, so repeated calls reuse kept-alive TLS connections. Every call has
+connect/read timeouts (OUTBOUND_HTTP_TIMEOUT unless overridden), idempotent
+methods are retried a bounded number of times with jittered exponential
+backoff, and each call's latency is logged and aggregated per host
+(see get_stats()) and passed to any listeners (see add_listener()).
+"""
+from urllib.parse import urlsplit
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', (5, 20))
+MAX_RETRIES = getattr(settings, 'OUTBOUND_HTTP_RETRIES', 2)
+POOL_SIZE = getattr(settings, 'OUTBOUND_HTTP_POOL_SIZE', 10)
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+# Hosts that get their own connection pool
+POOLED_HOSTS = (
+    _origin(getattr(settings, 'GRAPH_API_BASE', 'https://graph.facebook.com')),
+    _origin(getattr(settings, 'GOOGLE_SHEETS_BASE', 'https://docs.google.com')),
+)
+
+
+class JitterRetry(Retry):
+    """urllib3 Retry with random jitter added to the exponential backoff."""
+
+    BACKOFF_JITTER = 0.5
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.BACKOFF_JITTER)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies DEFAULT_TIMEOUT when a call does not pass one."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = DEFAULT_TIMEOUT
+        return super().send(request, **kwargs)
+
+
+def _build_session():
+    retry = JitterRetry(
+        total=MAX_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # POST is never retried: publishing a post twice is worse than failing
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS', 'DELETE'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    for prefix in POOLED_HOSTS:
+        session.mount(prefix, TimeoutHTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry))
+    session.mount('https://', TimeoutHTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=retry))
+    session.mount('http://', TimeoutHTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=retry))
+    return session
+
+
+session = _build_session()
+
+_stats = {}
+_stats_lock = threading.Lock()
+_listeners = []
+
+
+def _record(host, elapsed, failed):
+    with _stats_lock:
+        entry = _stats.setdefault(host, {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        entry['calls'] += 1
+        entry['errors'] += int(failed)
+        entry['total_seconds'] += elapsed
+        entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+
+
+def add_listener(callback):
+    """Call callback(host, elapsed_seconds, status_code_or_None) after every request."""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def get_stats():
+    """Per-host call counts, error counts and latency totals since startup."""
+    with _stats_lock:
+        return {host: dict(entry) for host, entry in _stats.items()}
+
+
+def request(method, url, **kwargs):
+    """Send a request through the shared session, timing it."""
+    parts = urlsplit(url)
+    started = time.perf_counter()
+    status = None
+    try:
+        response = session.request(method, url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        _record(parts.netloc, elapsed, failed=status is None or status >= 500)
+        for callback in _listeners:
+            callback(parts.netloc, elapsed, status)
+        # Path only: query strings carry access tokens
+        logger.debug(f'{method} {parts.netloc}{parts.path} -> {status} in {elapsed * 1000:.0f} ms')
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
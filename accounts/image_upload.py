@@ -0,0 +1,141 @@
+"""
+Photo upload pipeline for create_post_view.
+
+Uploaded images are no longer read into memory and forwarded at full size:
+
+- images larger than IMAGE_UPLOAD_MAX_BYTES or IMAGE_UPLOAD_MAX_DIMENSION
+  pixels are downscaled with Pillow and re-encoded as JPEG into a temporary
+  file on disk; anything already within limits (and GIFs) is sent untouched
+- the Pillow work runs in a pool of IMAGE_UPLOAD_WORKERS threads, which caps
+  how many large decodes can run (and hold pixel buffers) at once
+- MultipartFile streams the multipart/form-data body, reading the image in
+  chunks from Django's temporary upload file or from the re-encoded copy
+"""
+from concurrent.futures import ThreadPoolExecutor
+import io
+import logging
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_UPLOAD_MAX_DIMENSION = getattr(settings, 'IMAGE_UPLOAD_MAX_DIMENSION', 2048)
+IMAGE_UPLOAD_MAX_BYTES = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 4 * 1024 * 1024)
+IMAGE_UPLOAD_WORKERS = getattr(settings, 'IMAGE_UPLOAD_WORKERS', 2)
+JPEG_QUALITY = 85
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_UPLOAD_WORKERS, thread_name_prefix='image-upload')
+
+
+class MultipartFile:
+    """File-like multipart/form-data body with one file part read from disk in chunks.
+
+    requests sends objects with read() and __len__ as a streamed body with a
+    Content-Length header, so the file is never held in memory as a whole.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields, file_field, filename, fileobj, content_type):
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        head = io.BytesIO()
+        for name, value in fields.items():
+            head.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+            head.write(str(value).encode('utf-8'))
+            head.write(b'\r\n')
+        filename = filename.replace('"', '')
+        head.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+        )
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
+
+        self._length = head.tell() + file_size + len(tail)
+        head.seek(0)
+        self._parts = [head, fileobj, io.BytesIO(tail)]
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(part.read() for part in self._parts)
+
+        chunks = []
+        while size > 0 and self._parts:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _reencode(img):
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((IMAGE_UPLOAD_MAX_DIMENSION, IMAGE_UPLOAD_MAX_DIMENSION), Image.Resampling.LANCZOS)
+    if img.mode not in ('RGB', 'L'):
+        # JPEG has no alpha channel: flatten transparent images onto white
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.convert('RGBA').getchannel('A'))
+        img = background
+
+    output = tempfile.TemporaryFile()
+    img.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    output.seek(0)
+    return output
+
+
+def _prepare_image(uploaded_file):
+    uploaded_file.seek(0)
+    try:
+        with Image.open(uploaded_file) as img:
+            too_large = (
+                uploaded_file.size > IMAGE_UPLOAD_MAX_BYTES
+                or max(img.size) > IMAGE_UPLOAD_MAX_DIMENSION
+            )
+            # Re-encoding a GIF would drop its animation
+            if not too_large or img.format == 'GIF':
+                uploaded_file.seek(0)
+                return uploaded_file, uploaded_file.name, uploaded_file.content_type
+
+            original_size = img.size
+            # Let the JPEG decoder scale down while decoding, to save memory
+            img.draft('RGB', (IMAGE_UPLOAD_MAX_DIMENSION, IMAGE_UPLOAD_MAX_DIMENSION))
+            output = _reencode(img)
+    except (UnidentifiedImageError, OSError) as e:
+        # Not something Pillow can read: let Facebook accept or reject it
+        logger.warning(f'Could not process uploaded image {uploaded_file.name}: {e}')
+        uploaded_file.seek(0)
+        return uploaded_file, uploaded_file.name, uploaded_file.content_type
+
+    stem = os.path.splitext(os.path.basename(uploaded_file.name))[0] or 'photo'
+    logger.info(f'Re-encoded upload {uploaded_file.name}: {original_size} {uploaded_file.size} bytes -> {os.fstat(output.fileno()).st_size} bytes')
+    return output, f'{stem}.jpg', 'image/jpeg'
+
+
+def prepare_image(uploaded_file):
+    """Make an uploaded image fit Facebook's limits, using the worker pool.
+
+    Returns (file object, filename, content type). The file object is either
+    the upload itself or a temporary file the caller should close.
+    """
+    return _executor.submit(_prepare_image, uploaded_file).result()
@@ -0,0 +1,244 @@
+"""
+Per-view request instrumentation for the admin stats page.
+
+InstrumentationMiddleware measures every request, keyed by its URL name:
+
+- total latency
+- number and duration of SQL queries, through a connection execute wrapper
+- number and duration of outbound HTTP calls, through an accounts.http_client
+  listener
+- template rendering time, through the InstrumentedTemplates backend
+
+Measurements go into fixed-bucket histograms held in process memory. Every
+INSTRUMENTATION_FLUSH_INTERVAL seconds each process merges its histograms
+into one shared cache entry. The superuser page at portal/admin/stats/ reads
+them through get_view_stats(). The per-request cost is a few perf_counter()
+calls and dictionary updates.
+
+Only work in the request's own thread is attributed to the view. Background
+feed refreshes, the Graph batch and image worker pools, and the body of
+streaming responses are not counted.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTATION_ENABLED = getattr(settings, 'INSTRUMENTATION_ENABLED', True)
+FLUSH_INTERVAL = getattr(settings, 'INSTRUMENTATION_FLUSH_INTERVAL', 30)
+
+STATS_KEY = 'instrumentation:stats'
+# Refreshed on every flush, so only stats nobody has added to for this long expire
+STATS_TIMEOUT = 30 * 24 * 60 * 60
+LOCK_KEY = 'instrumentation:lock'
+
+METRICS = ('total_ms', 'db_queries', 'db_ms', 'http_calls', 'http_ms', 'template_ms')
+# Upper bounds of the histogram buckets, shared by times (ms) and counts;
+# the last bucket holds everything above
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Measurements of the request being handled in this thread/task, if any
+_current = ContextVar('instrumentation_sample', default=None)
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _new_sample():
+    return dict.fromkeys(METRICS, 0)
+
+
+def _new_entry():
+    return {
+        'count': 0,
+        'errors': 0,
+        'metrics': {
+            metric: {'sum': 0, 'max': 0, 'buckets': [0] * (len(BUCKETS) + 1)}
+            for metric in METRICS
+        },
+    }
+
+
+def _merge(target, source):
+    """Add the view entries of source into target."""
+    for view_name, entry in source.items():
+        total = target.setdefault(view_name, _new_entry())
+        total['count'] += entry['count']
+        total['errors'] += entry['errors']
+        for metric, histogram in entry['metrics'].items():
+            merged = total['metrics'][metric]
+            merged['sum'] += histogram['sum']
+            merged['max'] = max(merged['max'], histogram['max'])
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], histogram['buckets'])]
+
+
+def record(view_name, sample, failed=False):
+    """Add one request's measurements to this process's histograms."""
+    with _pending_lock:
+        entry = _pending.setdefault(view_name, _new_entry())
+        entry['count'] += 1
+        entry['errors'] += int(failed)
+        for metric, value in sample.items():
+            histogram = entry['metrics'][metric]
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+            histogram['buckets'][bisect_left(BUCKETS, value)] += 1
+
+
+def flush(force=False):
+    """Merge this process's histograms into the shared cache entry when due."""
+    global _pending, _last_flush
+    if not force and time.monotonic() - _last_flush < FLUSH_INTERVAL:
+        return
+    with _pending_lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+
+    if not cache.add(LOCK_KEY, True, 10):
+        # Another process is flushing: keep these for the next attempt
+        with _pending_lock:
+            _merge(_pending, pending)
+        return
+    try:
+        stats = cache.get(STATS_KEY) or {'since': time.time(), 'views': {}}
+        _merge(stats['views'], pending)
+        cache.set(STATS_KEY, stats, STATS_TIMEOUT)
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def reset_stats():
+    """Drop all collected stats, in this process and in the cache."""
+    global _pending
+    with _pending_lock:
+        _pending = {}
+    cache.delete(STATS_KEY)
+
+
+def _percentile(histogram, count, fraction):
+    """Upper bound of the bucket holding the given fraction of requests."""
+    seen = 0
+    for bound, bucket in zip(BUCKETS, histogram['buckets']):
+        seen += bucket
+        if seen >= count * fraction:
+            return min(bound, histogram['max'])
+    return histogram['max']
+
+
+def get_view_stats():
+    """
+    Summary rows per URL name, slowest total time first, plus the time
+    collection started (a UNIX timestamp, or None if nothing was recorded).
+    """
+    flush(force=True)
+    stats = cache.get(STATS_KEY) or {'since': None, 'views': {}}
+    rows = []
+    for view_name, entry in stats['views'].items():
+        count = entry['count']
+        metrics = entry['metrics']
+        row = {'view': view_name, 'count': count, 'errors': entry['errors']}
+        for metric in METRICS:
+            row[f'{metric}_avg'] = metrics[metric]['sum'] / count
+            row[f'{metric}_max'] = metrics[metric]['max']
+        for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            row[f'total_ms_{name}'] = _percentile(metrics['total_ms'], count, fraction)
+        row['total_ms_sum'] = metrics['total_ms']['sum']
+        rows.append(row)
+    rows.sort(key=lambda row: row['total_ms_sum'], reverse=True)
+    return rows, stats['since']
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample['db_queries'] += 1
+        sample['db_ms'] += (time.perf_counter() - started) * 1000
+
+
+def _install_db_wrapper(connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+def _http_listener(host, elapsed, status):
+    sample = _current.get()
+    if sample is not None:
+        sample['http_calls'] += 1
+        sample['http_ms'] += elapsed * 1000
+
+
+class TimedTemplate(Template):
+    """Django template that adds its render time to the current request's sample"""
+
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample['template_ms'] += (time.perf_counter() - started) * 1000
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class InstrumentationMiddleware:
+    """Records per-view latency, SQL, outbound HTTP and template timings (see module docstring)"""
+
+    def __init__(self, get_response):
+        if not INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(_install_db_wrapper, dispatch_uid='instrumentation_db_wrapper')
+        http_client.add_listener(_http_listener)
+
+    def __call__(self, request):
+        # Connections opened before the middleware was loaded have no wrapper yet
+        _install_db_wrapper(connection)
+        sample = _new_sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample['total_ms'] = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '<unresolved>'
+        try:
+            record(view_name, sample, failed=response.status_code >= 500)
+            flush()
+        except Exception:
+            # Stats must never break a request
+            logger.exception('Could not record request stats')
+        return response
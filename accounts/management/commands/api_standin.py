@@ -0,0 +1,260 @@
+"""
+Management command running a local stand-in for the Facebook Graph API and
+Google Sheets CSV export, for repeatable offline load and latency testing.
+
+Serves synthetic data for every outbound call the app makes:
+
+- GET    /v24.0/<page_id>?fields=name,feed.limit(N){...}   page name + first feed page
+- GET    /v24.0/<page_id>/feed?after=<cursor>                older feed pages
+- POST   /v24.0/<page_id>/feed, /v24.0/<page_id>/photos     publish (body is discarded)
+- DELETE /v24.0/<comment_id>                                 delete a comment
+- POST   /v24.0/ with batch=[...]                            batch requests
+- GET    /spreadsheets/d/<sheet_id>/export?format=csv        report sheet
+
+A sheet ID of the form ``rows-<N>`` returns N rows; any other ID returns
+--rows rows, growing by --growth rows per minute to mimic a live report.
+Latency, error rate and a per-second rate limit can be injected.
+
+Usage:
+    python manage.py api_standin --port 8765 --latency 120 --jitter 80 --error-rate 0.02
+
+    GRAPH_API_BASE=http://127.0.0.1:8765/v24.0 \\
+    GOOGLE_SHEETS_BASE=http://127.0.0.1:8765 python manage.py runserver
+"""
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from .bench_report import synthetic_report
+
+FEED_FIELDS_RE = re.compile(r'feed(?:\.limit\((\d+)\))?')
+GRAPH_PATH_RE = re.compile(r'^/v[\d.]+/?(?P<node>[^/]*)(?:/(?P<edge>[^/]+))?$')
+SHEET_PATH_RE = re.compile(r'^/spreadsheets/d/(?P<sheet_id>[^/]+)/export$')
+
+
+class StandinState:
+    """Synthetic data and fault injection shared by all handler threads."""
+
+    def __init__(self, options):
+        self.posts = options['posts']
+        self.rows = options['rows']
+        self.growth = options['growth']
+        self.latency = options['latency'] / 1000
+        self.jitter = options['jitter'] / 1000
+        self.error_rate = options['error_rate']
+        self.rate_limit = options['rate_limit']
+        self.started = time.monotonic()
+        self.random = random.Random(options['seed'])
+
+        self._lock = threading.Lock()
+        self._window = 0
+        self._window_count = 0
+        self._next_post = 0
+        self._csv = {}
+
+    def delay(self):
+        with self._lock:
+            pause = self.latency + self.random.uniform(0, self.jitter)
+        time.sleep(pause)
+
+    def fail(self):
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+    def rate_limited(self):
+        if not self.rate_limit:
+            return False
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window, self._window_count = window, 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit
+
+    def next_post_id(self, page_id):
+        with self._lock:
+            self._next_post += 1
+            return f'{page_id}_{10 ** 9 + self._next_post}'
+
+    def feed_page(self, page_id, offset, limit):
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        posts = []
+        for i in range(offset, min(offset + limit, self.posts)):
+            posts.append({
+                'id': f'{page_id}_{10 ** 9 - i}',
+                'message': f'Synthetic post {i} for page {page_id}',
+                'created_time': (now - timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M:%S+0000'),
+                'permalink_url': f'https://www.facebook.com/{page_id}/posts/{10 ** 9 - i}',
+            })
+        paging = {'cursors': {'before': _cursor(offset), 'after': _cursor(offset + len(posts))}}
+        if offset + limit < self.posts:
+            paging['next'] = f'/{page_id}/feed?after={_cursor(offset + limit)}'
+        return {'data': posts, 'paging': paging}
+
+    def sheet_rows(self, sheet_id):
+        match = re.match(r'^rows-(\d+)$', sheet_id)
+        if match:
+            return int(match.group(1))
+        minutes = (time.monotonic() - self.started) / 60
+        return self.rows + int(self.growth * minutes)
+
+    def sheet_csv(self, rows):
+        with self._lock:
+            content = self._csv.get(rows)
+        if content is None:
+            content = synthetic_report(rows).to_csv(index=False).encode('utf-8')
+            with self._lock:
+                # Growing sheets produce a new size every poll: keep only a few
+                if len(self._csv) >= 4:
+                    self._csv.pop(next(iter(self._csv)))
+                self._csv[rows] = content
+        return content
+
+
+def _cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def _offset(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        return 0
+
+
+def _graph_error(message, code, error_type='OAuthException'):
+    return {'error': {'message': message, 'type': error_type, 'code': code}}
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the app's pooled connections are exercised like in production
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ApiStandin/1.0'
+    state = None
+    quiet = False
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        self.state.delay()
+        if self.state.rate_limited():
+            return self._json(429, _graph_error('(#4) Application request limit reached', 4))
+        if self.state.fail():
+            return self._json(500, _graph_error('An unexpected error has occurred. Please retry your request later.', 2))
+
+        sheet = SHEET_PATH_RE.match(url.path)
+        if sheet and method == 'GET':
+            content = self.state.sheet_csv(self.state.sheet_rows(sheet.group('sheet_id')))
+            return self._send(200, content, 'text/csv; charset=utf-8')
+
+        graph = GRAPH_PATH_RE.match(url.path)
+        if not graph:
+            return self._json(404, _graph_error('Unknown path', 803))
+
+        node, edge = graph.group('node'), graph.group('edge')
+        if method == 'POST' and not node:
+            form = {key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()}
+            return self._json(200, self._batch(form.get('batch', '[]')))
+        if method == 'DELETE' and node and not edge:
+            return self._json(200, {'success': True})
+        if method == 'POST' and edge in ('feed', 'photos'):
+            post_id = self.state.next_post_id(node)
+            if edge == 'photos':
+                return self._json(200, {'id': post_id.split('_')[1], 'post_id': post_id})
+            return self._json(200, {'id': post_id})
+        if method == 'GET' and edge == 'feed':
+            limit = int(query.get('limit', 25))
+            return self._json(200, self.state.feed_page(node, _offset(query.get('after', '')), limit))
+        if method == 'GET' and node and not edge:
+            return self._json(200, self._node(node, query.get('fields', '')))
+        return self._json(400, _graph_error('Unsupported request', 100))
+
+    def _node(self, page_id, fields):
+        data = {'id': page_id}
+        if re.search(r'(^|,)name(,|$)', fields):
+            data['name'] = f'Stand-in Page {page_id}'
+        feed = FEED_FIELDS_RE.search(fields)
+        if feed:
+            data['feed'] = self.state.feed_page(page_id, 0, int(feed.group(1) or 25))
+        return data
+
+    def _batch(self, batch):
+        results = []
+        for operation in json.loads(batch):
+            if self.state.fail():
+                results.append(None)
+            elif operation.get('method') == 'DELETE':
+                results.append({'code': 200, 'body': json.dumps({'success': True})})
+            else:
+                results.append({'code': 400, 'body': json.dumps(_graph_error('Unsupported request', 100))})
+        return results
+
+    def _json(self, status, payload):
+        self._send(status, json.dumps(payload).encode(), 'application/json; charset=UTF-8')
+
+    def _send(self, status, content, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class Command(BaseCommand):
+    help = 'Run a local Graph API / Google Sheets stand-in with injectable latency, errors and rate limits'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+        parser.add_argument('--posts', type=int, default=500, help='Posts in every synthetic page feed (default: 500)')
+        parser.add_argument('--rows', type=int, default=10000, help='Rows in a synthetic report sheet (default: 10000)')
+        parser.add_argument('--growth', type=int, default=0, help='Rows appended to report sheets per minute (default: 0)')
+        parser.add_argument('--latency', type=float, default=0, help='Added latency per request in ms (default: 0)')
+        parser.add_argument('--jitter', type=float, default=0, help='Random extra latency up to this many ms (default: 0)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with a 500 (default: 0)')
+        parser.add_argument('--rate-limit', type=int, default=0, help='Requests per second before answering 429 (default: off)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible jitter and errors')
+        parser.add_argument('--quiet', action='store_true', help='Do not log every request')
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (StandinHandler,), {
+            'state': StandinState(options),
+            'quiet': options['quiet'],
+        })
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        server.daemon_threads = True
+
+        base = f'http://{options["host"]}:{server.server_port}'
+        self.stdout.write(self.style.SUCCESS(f'API stand-in listening on {base}'))
+        self.stdout.write(f'  GRAPH_API_BASE={base}/v24.0')
+        self.stdout.write(f'  GOOGLE_SHEETS_BASE={base}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
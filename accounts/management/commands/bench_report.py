@@ -0,0 +1,151 @@
+"""
+Management command to benchmark the report page pipeline on synthetic sheets.
+
+Compares the old whole-frame pipeline (astype(str) search, reverse, fillna,
+values.tolist() then slice) with the current one: column-by-column search
+masks, page-only materialisation and, unless --skip-db is given, paging and
+searching the synced ReportRow table. Reports latency and peak traced memory.
+Database work runs inside a transaction that is rolled back.
+
+Usage:
+    python manage.py bench_report
+    python manage.py bench_report --rows 10000 100000 500000 --query "hello 42"
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import numpy as np
+import pandas as pd
+
+from accounts.models import CustomUser, ReportRow, ReportSync
+from accounts.report_search import SearchResults, scan_positions, search_available
+from accounts.report_sync import store_rows
+
+PER_PAGE = 20
+
+
+def synthetic_report(rows):
+    """A report-shaped DataFrame: ids, names, comments, replies and some blanks."""
+    index = np.arange(rows)
+    return pd.DataFrame({
+        'Comment ID': [f'1234567890_{i}' for i in index],
+        'Name': [f'Customer {i % 5000}' for i in index],
+        'Comment': [f'hello {i} what is the price of item {i % 97}?' for i in index],
+        'Reply': np.where(index % 10 == 0, None, [f'Thanks! Item {i % 97} costs {i % 900} taka' for i in index]),
+        'Time': pd.Series(index, dtype='int64'),
+    })
+
+
+def legacy_page(df, query, page):
+    """The report pipeline as it was before the report table and index."""
+    if query:
+        mask = df.astype(str).apply(lambda x: x.str.contains(query, case=False, na=False)).any(axis=1)
+        df = df[mask]
+    df = df.iloc[::-1]
+    df = df.fillna('')
+    data_list = df.values.tolist()
+    start = (page - 1) * PER_PAGE
+    return len(data_list), data_list[start:start + PER_PAGE]
+
+
+def columnar_page(df, query, page):
+    """Search mask, ordering and totals stay in numpy; only the page becomes Python objects."""
+    if query:
+        positions = scan_positions(df, query)
+    else:
+        positions = np.arange(len(df) - 1, -1, -1)
+    start = (page - 1) * PER_PAGE
+    return int(positions.size), df.iloc[positions[start:start + PER_PAGE]].fillna('').values.tolist()
+
+
+def measure(func, *args):
+    """Run func once, returning (result, seconds, peak traced bytes)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = 'Benchmark report paging and search latency / peak memory on synthetic sheets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 500000],
+            help='Sheet sizes to benchmark (default: 10000 100000 500000)',
+        )
+        parser.add_argument(
+            '--query',
+            default='price of item 42',
+            help='Search query used for the filtered runs',
+        )
+        parser.add_argument(
+            '--page',
+            type=int,
+            default=3,
+            help='Page number requested (default: 3)',
+        )
+        parser.add_argument(
+            '--skip-db',
+            action='store_true',
+            help='Only benchmark the DataFrame pipelines, not the synced report table',
+        )
+
+    def handle(self, *args, **options):
+        query = options['query']
+        page = options['page']
+
+        self.stdout.write(f'{"rows":>8}  {"pipeline":<22} {"query":<6} {"total":>8} {"ms":>10} {"peak MB":>10}')
+        for rows in options['rows']:
+            df = synthetic_report(rows)
+
+            cases = [
+                ('legacy dataframe', legacy_page),
+                ('columnar dataframe', columnar_page),
+            ]
+            for name, func in cases:
+                for q in ('', query):
+                    (total, _), elapsed, peak = measure(func, df, q, page)
+                    self._row(rows, name, q, total, elapsed, peak)
+
+            if not options['skip_db']:
+                self._bench_db(df, rows, query, page)
+
+    def _bench_db(self, df, rows, query, page):
+        start = (page - 1) * PER_PAGE
+        with transaction.atomic():
+            user = CustomUser.objects.create(email=f'bench-report-{time.time_ns()}@example.invalid')
+            store_rows(user, df)
+            sync_state = ReportSync.objects.create(
+                user=user, sheet_id='bench', columns=[str(c) for c in df.columns], row_count=rows,
+            )
+
+            def table_page():
+                data = ReportRow.objects.filter(user=user).values_list('data', flat=True)
+                return sync_state.row_count, list(data[start:start + PER_PAGE])
+
+            def table_search():
+                results = SearchResults(user, sync_state, query)
+                return results.count(), results[start:start + PER_PAGE]
+
+            (total, _), elapsed, peak = measure(table_page)
+            self._row(rows, 'report table', '', total, elapsed, peak)
+            if search_available():
+                (total, _), elapsed, peak = measure(table_search)
+                self._row(rows, 'report table + fts5', query, total, elapsed, peak)
+
+            transaction.set_rollback(True)
+
+    def _row(self, rows, name, query, total, elapsed, peak):
+        self.stdout.write(
+            f'{rows:>8}  {name:<22} {"yes" if query else "no":<6} {total:>8} '
+            f'{elapsed * 1000:>10.1f} {peak / (1024 * 1024):>10.1f}'
+        )
@@ -0,0 +1,65 @@
+"""
+Management command delivering config change webhooks from the outbox.
+
+Records subscription_expired events for subscriptions that ran out since the
+last run, POSTs all due events to CONFIG_WEBHOOK_URL in batches, and purges
+delivered events older than a week. Failed batches are retried with
+exponential backoff on later runs.
+
+Usage:
+    python manage.py dispatch_config_events                  # one pass, e.g. from cron
+    python manage.py dispatch_config_events --loop --interval 5
+
+Only one dispatcher runs at a time: others exit until the running one's
+database lease is released or expires.
+"""
+from datetime import timedelta
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.config_events import (
+    acquire_dispatch_lease, dispatch_events, purge_sent_events, record_expired_subscriptions,
+    release_dispatch_lease, webhooks_enabled,
+)
+
+
+class Command(BaseCommand):
+    help = 'Send pending config change events to CONFIG_WEBHOOK_URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events per webhook request (default: 100)')
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of doing a single pass')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between passes with --loop (default: 5)')
+
+    def handle(self, *args, **options):
+        if not webhooks_enabled():
+            raise CommandError('CONFIG_WEBHOOK_URL is not set.')
+
+        owner = uuid.uuid4().hex
+        lease = timedelta(seconds=max(300, options['interval'] * 4))
+        if not acquire_dispatch_lease(owner, lease):
+            raise CommandError('Another dispatcher is already running.')
+        try:
+            while True:
+                self.run_pass(options['batch_size'])
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                if not acquire_dispatch_lease(owner, lease):
+                    raise CommandError('Dispatcher lease was taken over by another process.')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            release_dispatch_lease(owner)
+
+    def run_pass(self, batch_size):
+        expired = record_expired_subscriptions()
+        sent, failed = dispatch_events(batch_size)
+        purged = purge_sent_events()
+        if expired or sent or failed or purged:
+            style = self.style.ERROR if failed else self.style.SUCCESS
+            self.stdout.write(style(
+                f'Expired: {expired}, sent: {sent}, failed: {failed}, purged: {purged}'
+            ))
@@ -1,29 +1,66 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
+from django.utils import timezone
+
+from .config_cache import get_config_version
+
+SESSION_KEY = '_subscription_gate'
+
 
 class SubscriptionMiddleware:
+    """
+    Redirect users with an expired subscription to the subscription_expired page.
+
+    The user's subscription expiry is kept in the session together with their
+    config version (bumped by every UserProfile save, including the admin
+    subscription actions; see accounts.signals). The profile is only read
+    again when the version changes or the stored expiry has passed.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self._allowed_paths = None
+
+    def allowed_paths(self):
+        """Paths that are always allowed even if expired (resolved on first use)"""
+        if self._allowed_paths is None:
+            self._allowed_paths = (
+                reverse('subscription_expired'),
+                reverse('logout'),
+                '/admin/',
+            )
+        return self._allowed_paths
 
     def __call__(self, request):
         if not request.user.is_authenticated:
             return self.get_response(request)
-            
-        # Paths that are always allowed even if expired
-        allowed_paths = [
-            reverse('subscription_expired'),
-            reverse('logout'),
-            '/admin/',
-        ]
-        
+
         # Check if current path matches any allowed path
-        for path in allowed_paths:
-            if request.path.startswith(path):
-                return self.get_response(request)
-        
+        if request.path.startswith(self.allowed_paths()):
+            return self.get_response(request)
+
         # Check subscription status
-        if hasattr(request.user, 'profile') and not request.user.profile.is_subscription_active():
+        if not self.subscription_active(request):
             return redirect('subscription_expired')
-            
+
         return self.get_response(request)
+
+    def subscription_active(self, request):
+        version = get_config_version(request.user.pk)
+        now = timezone.now().timestamp()
+        state = request.session.get(SESSION_KEY)
+        if state and state['version'] == version:
+            expiry = state['expiry']
+            if expiry is None or now < expiry:
+                return True
+            if state['confirmed']:
+                return False
+
+        # Version changed or the stored expiry passed: re-check the profile,
+        # which accounts.backends loads together with request.user
+        profile = getattr(request.user, 'profile', None)
+        expiry = profile.subscription_expiry.timestamp() if profile and profile.subscription_expiry else None
+        active = expiry is None or now < expiry
+        request.session[SESSION_KEY] = {'version': version, 'expiry': expiry, 'confirmed': not active}
+        return active
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_userprofile_kyc_rejection_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_id', models.CharField(blank=True, max_length=200)),
+                ('columns', models.JSONField(default=list)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('tail_hash', models.CharField(blank=True, help_text='Hash of the last synced rows, used to detect rewrites', max_length=40)),
+                ('version', models.CharField(blank=True, help_text='Content hash of the last synced sheet download', max_length=40)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='report_sync', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.PositiveIntegerField(help_text='1-based position of the row in the sheet')),
+                ('data', models.JSONField(default=list, help_text='Cell values in column order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_rows', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-row_number'],
+                'unique_together': {('user', 'row_number')},
+            },
+        ),
+    ]
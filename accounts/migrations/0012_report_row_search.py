@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+from django.db import OperationalError, migrations
+
+SEARCH_TABLE = 'accounts_reportrow_search'
+
+
+def create_report_search(apps, schema_editor):
+    """Create the FTS5 report index (SQLite only) and index rows synced so far."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    ReportRow = apps.get_model('accounts', 'ReportRow')
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "owner, text, row_number UNINDEXED, col UNINDEXED, tokenize = 'trigram')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5 / trigram tokenizer; search falls back to scanning
+            return
+
+        cells = (
+            (f'<{user_id}>', str(value), row_number, col)
+            for user_id, row_number, values in ReportRow.objects.values_list('user_id', 'row_number', 'data').iterator()
+            for col, value in enumerate(values)
+            if value != ''
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (owner, text, row_number, col) VALUES (%s, %s, %s, %s)",
+            cells,
+        )
+
+
+def drop_report_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_report_rows'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_report_search, drop_report_search),
+    ]
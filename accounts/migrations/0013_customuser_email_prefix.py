@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+def backfill_email_prefix(apps, schema_editor):
+    """Store each user's lowercased email prefix; the oldest account keeps a shared prefix."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    claimed = set()
+    updated = []
+    for user in CustomUser.objects.order_by('pk').only('pk', 'email').iterator():
+        prefix = (user.email.split('@')[0] if '@' in user.email else user.email).lower()
+        if not prefix or prefix in claimed:
+            continue
+        claimed.add(prefix)
+        user.email_prefix = prefix
+        updated.append(user)
+    CustomUser.objects.bulk_update(updated, ['email_prefix'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_report_row_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_prefix',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_email_prefix, migrations.RunPython.noop),
+    ]
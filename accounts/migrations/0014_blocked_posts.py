@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_blocked_post_ids(apps, schema_editor):
+    """Move the newline-separated blocked_post_ids text into BlockedPost rows."""
+    AIAgentConfig = apps.get_model('accounts', 'AIAgentConfig')
+    BlockedPost = apps.get_model('accounts', 'BlockedPost')
+    rows = []
+    for config_id, text in AIAgentConfig.objects.exclude(blocked_post_ids='').values_list('id', 'blocked_post_ids').iterator():
+        post_ids = dict.fromkeys(pid.strip() for pid in text.split('\n') if pid.strip())
+        rows.extend(BlockedPost(config_id=config_id, post_id=post_id[:255]) for post_id in post_ids)
+    BlockedPost.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def restore_blocked_post_ids(apps, schema_editor):
+    AIAgentConfig = apps.get_model('accounts', 'AIAgentConfig')
+    BlockedPost = apps.get_model('accounts', 'BlockedPost')
+    post_ids = {}
+    for config_id, post_id in BlockedPost.objects.order_by('id').values_list('config_id', 'post_id').iterator():
+        post_ids.setdefault(config_id, []).append(post_id)
+    for config_id, ids in post_ids.items():
+        AIAgentConfig.objects.filter(pk=config_id).update(blocked_post_ids='\n'.join(ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_customuser_email_prefix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_posts', to='accounts.aiagentconfig')),
+            ],
+            options={
+                'ordering': ['id'],
+                'unique_together': {('config', 'post_id')},
+            },
+        ),
+        migrations.RunPython(copy_blocked_post_ids, restore_blocked_post_ids),
+        migrations.RemoveField(
+            model_name='aiagentconfig',
+            name='blocked_post_ids',
+        ),
+    ]
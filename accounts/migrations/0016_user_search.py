@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:30
+
+from django.db import OperationalError, migrations, models
+
+SEARCH_TABLE = 'accounts_customuser_search'
+
+
+def create_user_search(apps, schema_editor):
+    """Create the FTS5 admin user index (SQLite only) and index every user."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "email, name, mobile_number, tokenize = 'trigram')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5 / trigram tokenizer; search falls back to icontains
+            return
+
+        rows = (
+            (user_id, email, name or '', mobile_number or '')
+            for user_id, email, name, mobile_number in CustomUser.objects.values_list(
+                'pk', 'email', 'profile__name', 'profile__mobile_number',
+            ).iterator()
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, email, name, mobile_number) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_user_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_config_events'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['is_active'], name='accounts_cu_is_acti_2885e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['date_joined'], name='accounts_cu_date_jo_fcefff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['kyc_status'], name='accounts_us_kyc_sta_0b1856_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['subscription_expiry'], name='accounts_us_subscri_d9beb5_idx'),
+        ),
+        migrations.RunPython(create_user_search, drop_user_search),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_user_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigEventState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expiry_scanned_at', models.DateTimeField(blank=True, help_text='Subscriptions expiring up to this time have been announced', null=True)),
+                ('lock_owner', models.CharField(blank=True, max_length=64)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
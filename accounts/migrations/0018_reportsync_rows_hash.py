@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-17 19:40
+
+from django.db import migrations, models
+
+
+def clear_rows_hash(apps, schema_editor):
+    """Old values hash only the tail; clearing them makes the next sync a full resync."""
+    ReportSync = apps.get_model('accounts', 'ReportSync')
+    ReportSync.objects.update(rows_hash='', version='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_config_event_state'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='reportsync',
+            old_name='tail_hash',
+            new_name='rows_hash',
+        ),
+        migrations.AlterField(
+            model_name='reportsync',
+            name='rows_hash',
+            field=models.CharField(blank=True, help_text='Hash of all synced rows, used to detect rewrites', max_length=40),
+        ),
+        migrations.RunPython(clear_rows_hash, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class CustomUserManager(BaseUserManager):
@@ -24,27 +25,115 @@ class CustomUserManager(BaseUserManager):
             raise ValueError('Superuser must have is_superuser=True.')
         
         return self.create_user(email, password, **extra_fields)
+    
+    def get_by_email_prefix(self, email_prefix):
+        """Find a user by email prefix (or exact email) using indexed columns; None if not found"""
+        return self.filter(
+            models.Q(email_prefix=email_prefix.lower()) | models.Q(email=email_prefix)
+        ).order_by('pk').first()
+
+
+def email_prefix_key(email):
+    """Lowercased part of an email before the @ symbol, as stored in CustomUser.email_prefix"""
+    return (email.split('@')[0] if '@' in email else email).lower()
+
+
+def hand_over_email_prefix(prefix):
+    """Give a released prefix to the oldest account whose email has it but that has none stored."""
+    heir = CustomUser.objects.filter(
+        models.Q(email__istartswith=f'{prefix}@') | models.Q(email__iexact=prefix),
+        email_prefix__isnull=True,
+    ).order_by('pk').first()
+    if heir is not None and not CustomUser.objects.filter(email_prefix=prefix).exists():
+        heir.email_prefix = prefix
+        heir.save(update_fields=['email_prefix'])
 
 
 class CustomUser(AbstractUser):
     """Custom user model with email as username"""
     username = None
     email = models.EmailField(unique=True)
+    # Indexed copy of the email prefix for the config API and privacy pages.
+    # NULL when another account already owns the same prefix.
+    email_prefix = models.CharField(max_length=254, unique=True, null=True, blank=True, editable=False)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
     
     objects = CustomUserManager()
     
+    class Meta(AbstractUser.Meta):
+        # Admin user list status filter and newest-first ordering
+        indexes = [
+            models.Index(fields=['is_active']),
+            models.Index(fields=['date_joined']),
+        ]
+    
     def __str__(self):
         return self.email
     
+    def save(self, *args, **kwargs):
+        # Keep email_prefix in sync with email (skipped for saves like last_login updates)
+        update_fields = kwargs.get('update_fields')
+        released = None
+        if update_fields is None or 'email' in update_fields:
+            previous = self.email_prefix
+            self.email_prefix = self._claim_email_prefix()
+            if previous and previous != self.email_prefix:
+                released = previous
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'email_prefix'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if released:
+                hand_over_email_prefix(released)
+    
+    def _claim_email_prefix(self):
+        """The prefix to store for this email: None if another account already owns it"""
+        prefix = email_prefix_key(self.email) if self.email else None
+        if not prefix or prefix == self.email_prefix:
+            return prefix
+        if CustomUser.objects.filter(email_prefix=prefix).exclude(pk=self.pk).exists():
+            return None
+        return prefix
+    
     def get_email_prefix(self):
         """Get the part of email before @ symbol"""
         return self.email.split('@')[0] if '@' in self.email else self.email
+    
+    def get_profile(self):
+        """The user's profile, created if missing (no query when loaded by accounts.backends)"""
+        try:
+            return self.profile
+        except UserProfile.DoesNotExist:
+            self.profile, _ = UserProfile.objects.get_or_create(user=self)
+            return self.profile
+    
+    def get_ai_config(self):
+        """The user's AI agent config, created if missing (no query when loaded by accounts.backends)"""
+        try:
+            return self.ai_config
+        except AIAgentConfig.DoesNotExist:
+            self.ai_config, _ = AIAgentConfig.objects.get_or_create(user=self)
+            return self.ai_config
+
+
+class AtomicSaveModel(models.Model):
+    """
+    Saves run in one transaction with their post_save handlers, so the config
+    webhook events those handlers record (accounts.config_events) are
+    committed together with the change, or not at all.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
 
-class UserProfile(models.Model):
+class UserProfile(AtomicSaveModel):
     """User profile with additional information"""
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='profile')
     name = models.CharField(max_length=255, blank=True)
@@ -84,8 +173,15 @@ class UserProfile(models.Model):
             return True # Allow access if no expiry set (or change logic as needed)
         return timezone.now() < self.subscription_expiry
 
+    class Meta:
+        # Admin KYC/subscription status filters and counters
+        indexes = [
+            models.Index(fields=['kyc_status']),
+            models.Index(fields=['subscription_expiry']),
+        ]
+
 
-class AIAgentConfig(models.Model):
+class AIAgentConfig(AtomicSaveModel):
     """AI Agent configuration for each user"""
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='ai_config')
     is_active = models.BooleanField(default=True, help_text='Turn AI agent on/off')
@@ -94,7 +190,6 @@ class AIAgentConfig(models.Model):
 
     system_prompt = models.TextField(blank=True)
     google_sheet_id = models.CharField(max_length=200, blank=True, help_text='Google Sheet ID for reports')
-    blocked_post_ids = models.TextField(blank=True, help_text='Newline-separated list of Facebook post IDs to block')
     
     def __str__(self):
         return f"{self.user.email}'s AI config"
@@ -105,10 +200,22 @@ class AIAgentConfig(models.Model):
         return f"https://ftn8nbd.onrender.com/webhook/{email_prefix}"
     
     def get_blocked_post_ids_list(self):
-        """Return blocked post IDs as a list"""
-        if not self.blocked_post_ids:
-            return []
-        return [pid.strip() for pid in self.blocked_post_ids.strip().split('\n') if pid.strip()]
+        """Return blocked post IDs as a list (uses prefetch_related('blocked_posts') when present)"""
+        return [blocked.post_id for blocked in self.blocked_posts.all()]
+
+
+class BlockedPost(AtomicSaveModel):
+    """A Facebook post the AI agent must not respond to"""
+    config = models.ForeignKey(AIAgentConfig, on_delete=models.CASCADE, related_name='blocked_posts')
+    post_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        unique_together = ('config', 'post_id')
+    
+    def __str__(self):
+        return f"{self.post_id} blocked for {self.config_id}"
 
 
 class SubscriptionHistory(models.Model):
@@ -125,3 +232,83 @@ class SubscriptionHistory(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Subscription Histories"
+
+
+class ReportSync(models.Model):
+    """Sync state of a user's Google Sheet report (see accounts.report_sync)"""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='report_sync')
+    sheet_id = models.CharField(max_length=200, blank=True)
+    columns = models.JSONField(default=list)
+    row_count = models.PositiveIntegerField(default=0)
+    rows_hash = models.CharField(max_length=40, blank=True, help_text='Hash of all synced rows, used to detect rewrites')
+    version = models.CharField(max_length=40, blank=True, help_text='Content hash of the last synced sheet download')
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.email}'s report sync"
+
+
+class ReportRow(models.Model):
+    """A single row of a user's Google Sheet report, stored locally"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='report_rows')
+    row_number = models.PositiveIntegerField(help_text='1-based position of the row in the sheet')
+    data = models.JSONField(default=list, help_text='Cell values in column order')
+
+    def __str__(self):
+        return f"{self.user.email} - row {self.row_number}"
+
+    class Meta:
+        ordering = ['-row_number']
+        unique_together = ('user', 'row_number')
+
+
+class ConfigEvent(models.Model):
+    """Outbox entry announcing a config or status change to CONFIG_WEBHOOK_URL (see accounts.config_events)"""
+    EVENT_TYPE_CHOICES = (
+        ('config_changed', 'Config changed'),
+        ('kyc_changed', 'KYC status changed'),
+        ('subscription_changed', 'Subscription changed'),
+        ('subscription_expired', 'Subscription expired'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('retry', 'Waiting for retry'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='config_events')
+    email_prefix = models.CharField(max_length=254)
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPE_CHOICES)
+    data = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True, help_text='Pending events with the same key are sent once')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.event_type} for {self.email_prefix} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_config_event',
+            ),
+        ]
+
+
+class ConfigEventState(models.Model):
+    """Single row holding the dispatcher lease and expiry-scan watermark (see accounts.config_events)"""
+    expiry_scanned_at = models.DateTimeField(null=True, blank=True, help_text='Subscriptions expiring up to this time have been announced')
+    lock_owner = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Config event dispatcher (scanned to {self.expiry_scanned_at})"
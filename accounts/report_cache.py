@@ -0,0 +1,148 @@
+"""
+In-process cache of parsed Google Sheet reports.
+
+Every report page view, search and 30-second auto-refresh used to download
+and re-parse the whole sheet. The parsed DataFrame is now kept per sheet ID
+for REPORT_CACHE_TTL seconds, and the least recently used sheets are evicted
+once the cached frames exceed REPORT_CACHE_MAX_BYTES in total.
+"""
+from collections import OrderedDict
+import hashlib
+import io
+import logging
+import threading
+import time
+
+from django.conf import settings
+import pandas as pd
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_SHEETS_BASE = getattr(settings, 'GOOGLE_SHEETS_BASE', 'https://docs.google.com').rstrip('/')
+SHEET_EXPORT_URL = GOOGLE_SHEETS_BASE + "/spreadsheets/d/{sheet_id}/export?format=csv"
+# Large sheets take a while to export; allow a longer read timeout than the default
+EXPORT_TIMEOUT = (5, 60)
+
+
+class CachedReport:
+    """A parsed sheet together with the metadata needed to expire it."""
+
+    def __init__(self, sheet_id, df, version):
+        self.sheet_id = sheet_id
+        self.df = df
+        self.version = version
+        self.fetched_at = time.monotonic()
+        self.nbytes = int(df.memory_usage(index=True, deep=True).sum())
+
+    def is_fresh(self, ttl):
+        return time.monotonic() - self.fetched_at < ttl
+
+
+class ReportCache:
+    """Thread-safe LRU cache of CachedReport objects bounded by total memory."""
+
+    def __init__(self, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # One lock per sheet so concurrent requests share a single download
+        self._fetch_locks = {}
+
+    def get(self, sheet_id):
+        """Return the cached report for sheet_id, downloading it if missing or expired."""
+        report = self._get_fresh(sheet_id)
+        if report is not None:
+            return report
+
+        with self._fetch_lock(sheet_id):
+            # Another request may have refreshed the sheet while we waited
+            report = self._get_fresh(sheet_id)
+            if report is not None:
+                return report
+            report = self._fetch(sheet_id)
+            self._store(report)
+            return report
+
+    def peek(self, sheet_id):
+        """Return the cached report for sheet_id if it is still fresh, never downloading."""
+        return self._get_fresh(sheet_id)
+
+    def invalidate(self, sheet_id):
+        """Drop a sheet from the cache, e.g. after its ID was changed."""
+        with self._lock:
+            report = self._entries.pop(sheet_id, None)
+            if report is not None:
+                self._total_bytes -= report.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _get_fresh(self, sheet_id):
+        with self._lock:
+            report = self._entries.get(sheet_id)
+            if report is None or not report.is_fresh(self.ttl):
+                return None
+            self._entries.move_to_end(sheet_id)
+            return report
+
+    def _fetch_lock(self, sheet_id):
+        with self._lock:
+            return self._fetch_locks.setdefault(sheet_id, threading.Lock())
+
+    def _fetch(self, sheet_id):
+        response = http_client.get(SHEET_EXPORT_URL.format(sheet_id=sheet_id), timeout=EXPORT_TIMEOUT)
+        response.raise_for_status()
+
+        # Read into pandas DataFrame with UTF-8 encoding
+        # Use content (bytes) and BytesIO for better encoding handling
+        df = pd.read_csv(io.BytesIO(response.content), encoding='utf-8')
+        version = hashlib.sha1(response.content).hexdigest()
+        return CachedReport(sheet_id, df, version)
+
+    def _store(self, report):
+        with self._lock:
+            previous = self._entries.pop(report.sheet_id, None)
+            if previous is not None:
+                self._total_bytes -= previous.nbytes
+
+            if report.nbytes > self.max_bytes:
+                # Too large to share; the caller still gets this copy
+                logger.warning(f'Report {report.sheet_id} ({report.nbytes} bytes) exceeds the report cache limit')
+                return
+
+            self._entries[report.sheet_id] = report
+            self._total_bytes += report.nbytes
+
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+                self._fetch_locks.pop(evicted.sheet_id, None)
+
+
+report_cache = ReportCache(
+    ttl=getattr(settings, 'REPORT_CACHE_TTL', 60),
+    max_bytes=getattr(settings, 'REPORT_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+)
+
+
+def get_report(sheet_id):
+    """Return the parsed report for a Google Sheet ID (cached)."""
+    return report_cache.get(sheet_id)
+
+
+def fresh_report_version(sheet_id):
+    """Content version of a sheet if a fresh copy is cached, else None (no download)."""
+    report = report_cache.peek(sheet_id)
+    return report.version if report is not None else None
+
+
+def invalidate_report(sheet_id):
+    """Forget the cached report for a Google Sheet ID."""
+    if sheet_id:
+        report_cache.invalidate(sheet_id)
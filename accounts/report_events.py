@@ -0,0 +1,86 @@
+"""
+Server-sent events feed for the live report table.
+
+Instead of the browser re-downloading a page of the report every 30 seconds,
+report.html keeps an EventSource open on /report-events/. The stream checks
+the (cached) sheet every REPORT_EVENTS_INTERVAL seconds and only sends
+something when the report's content version changes:
+
+- ``rows``:  the rows appended since the client's last row, newest first
+- ``reset``: the sheet was rewritten, or too many rows arrived to push;
+             the client reloads the current page from /report-data/
+
+Each event id is ``<row count>:<version>`` so a reconnecting EventSource
+resumes from where it left off. Streams end after REPORT_EVENTS_MAX_AGE
+seconds and the browser reconnects. The view is async, so it has to be
+served through userpanel_project.asgi; hidden tabs close their stream.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import ReportRow
+from .report_sync import sync_report
+
+logger = logging.getLogger(__name__)
+
+REPORT_EVENTS_INTERVAL = getattr(settings, 'REPORT_EVENTS_INTERVAL', 15)
+REPORT_EVENTS_MAX_AGE = getattr(settings, 'REPORT_EVENTS_MAX_AGE', 300)
+# More new rows than this and the client is told to reload instead
+MAX_PUSHED_ROWS = 100
+
+
+def parse_event_id(event_id):
+    """Split a "<row count>:<version>" event id; (None, '') if it is malformed."""
+    row_count, _, version = (event_id or '').partition(':')
+    try:
+        return int(row_count), version
+    except ValueError:
+        return None, ''
+
+
+def _rows_after(user, row_number):
+    rows = ReportRow.objects.filter(user=user, row_number__gt=row_number).values_list('data', flat=True)
+    return list(rows[:MAX_PUSHED_ROWS + 1])
+
+
+def _event(name, event_id, payload):
+    return f'id: {event_id}\nevent: {name}\ndata: {json.dumps(payload)}\n\n'
+
+
+async def report_event_stream(user, sheet_id, last_row, version):
+    """Async generator of SSE messages for a user's report."""
+    deadline = time.monotonic() + REPORT_EVENTS_MAX_AGE
+    yield f'retry: {int(REPORT_EVENTS_INTERVAL * 1000)}\n\n'
+
+    while time.monotonic() < deadline:
+        try:
+            state = await sync_to_async(sync_report)(user, sheet_id)
+        except Exception as e:
+            logger.warning(f'Report events: sync failed for {user.email}: {e}')
+            state = None
+
+        if state is not None and state.version != version:
+            event_id = f'{state.row_count}:{state.version}'
+            new_rows = []
+            if last_row is not None and state.row_count > last_row:
+                new_rows = await sync_to_async(_rows_after)(user, last_row)
+
+            if new_rows and len(new_rows) <= MAX_PUSHED_ROWS:
+                yield _event('rows', event_id, {
+                    'rows': new_rows,
+                    'total_records': state.row_count,
+                })
+            else:
+                yield _event('reset', event_id, {'total_records': state.row_count})
+
+            last_row, version = state.row_count, state.version
+        else:
+            # Comment line keeps proxies from closing an idle connection
+            yield ': keep-alive\n\n'
+
+        await asyncio.sleep(REPORT_EVENTS_INTERVAL)
@@ -0,0 +1,111 @@
+"""
+Streaming report downloads.
+
+Rows are read from the synced ReportRow table in chunks and written out one
+at a time, so worker memory stays flat however large the report is:
+
+- csv:    streamed through StreamingHttpResponse
+- ndjson: one JSON object per row, streamed through StreamingHttpResponse
+- xlsx:   openpyxl write-only workbook spooled to a temporary file on disk,
+          then streamed with FileResponse
+
+Under ASGI the bodies are served as async iterators (see accounts.streaming).
+"""
+import csv
+from functools import partial
+import json
+import tempfile
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+from .models import ReportRow
+from .report_search import fetch_rows, matching_row_numbers
+from .streaming import aiter_batches, streaming_content
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'ndjson')
+CHUNK_SIZE = 2000
+# Bytes read from the spooled workbook per chunk
+FILE_BLOCK_SIZE = 64 * 1024
+
+
+class Echo:
+    """File-like object that returns what is written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_report_rows(user, sync_state, query=''):
+    """Yield the cell values of the user's report rows (newest first), optionally filtered."""
+    if not query:
+        rows = ReportRow.objects.filter(user=user).values_list('data', flat=True)
+        yield from rows.iterator(chunk_size=CHUNK_SIZE)
+        return
+
+    row_numbers = matching_row_numbers(user, sync_state, query)
+    for start in range(0, len(row_numbers), CHUNK_SIZE):
+        yield from fetch_rows(user, row_numbers[start:start + CHUNK_SIZE])
+
+
+def _stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    # BOM so that Excel opens UTF-8 (e.g. Bangla) text correctly
+    yield '\ufeff' + writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _stream_ndjson(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+
+
+def _xlsx_file(columns, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Report')
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+
+    # Unnamed temporary file, removed by the OS once FileResponse closes it
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
+
+
+def export_report(request, sync_state, query='', fmt='xlsx'):
+    """Build a streaming download response of the user's report in the given format."""
+    columns = sync_state.columns
+    rows = iter_report_rows(request.user, sync_state, query)
+
+    if fmt == 'csv':
+        response = StreamingHttpResponse(
+            streaming_content(request, _stream_csv(columns, rows)),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="report.csv"'
+        return response
+
+    if fmt == 'ndjson':
+        response = StreamingHttpResponse(
+            streaming_content(request, _stream_ndjson(columns, rows)),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = 'attachment; filename="report.ndjson"'
+        return response
+
+    spool = _xlsx_file(columns, rows)
+    response = FileResponse(
+        spool,
+        as_attachment=True,
+        filename='report.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    if isinstance(request, ASGIRequest):
+        # The spool stays registered for closing; only how it is read changes
+        blocks = iter(partial(spool.read, FILE_BLOCK_SIZE), b'')
+        response.streaming_content = aiter_batches(blocks, batch_size=1)
+    return response
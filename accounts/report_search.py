@@ -0,0 +1,188 @@
+"""
+Full-text search over synced report rows.
+
+On SQLite every non-empty cell of a user's ReportRow table is mirrored into
+an FTS5 table using the trigram tokenizer. That gives case-insensitive
+substring (and therefore prefix) matching with bm25 ranking, without
+scanning the sheet on every keystroke. The index is maintained by
+accounts.report_sync as rows are appended or resynced.
+
+Queries of the form ``column: text`` are restricted to that report column.
+Databases without FTS5 fall back to scanning the cached sheet with pandas.
+"""
+from django.db import connection
+import numpy as np
+
+from .fts import LIKE_ESCAPE, MIN_TRIGRAM_LENGTH, like_contains, quote, table_available
+from .models import ReportRow
+from .report_cache import get_report
+
+SEARCH_TABLE = 'accounts_reportrow_search'
+
+
+def search_available():
+    """Whether the FTS5 report index (migration 0012) exists in the default database."""
+    return table_available(SEARCH_TABLE)
+
+
+def _owner(user_id):
+    # Delimited so that e.g. user 1 never matches the trigrams of user 12
+    return f'<{user_id}>'
+
+
+def index_rows(user_id, rows):
+    """Add (row_number, cell values) pairs of a user's report to the index."""
+    if not search_available():
+        return
+    owner = _owner(user_id)
+    cells = (
+        (owner, str(value), row_number, col)
+        for row_number, values in rows
+        for col, value in enumerate(values)
+        if value != ''
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (owner, text, row_number, col) VALUES (%s, %s, %s, %s)",
+            cells,
+        )
+
+
+def clear_index(user_id):
+    """Remove all of a user's report cells from the index."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [f'owner:{quote(_owner(user_id))}'],
+        )
+
+
+def parse_query(query, columns):
+    """
+    Split "column: text" into (column index, text).
+    Returns (None, query) when the query is not scoped to a known column.
+    """
+    name, sep, term = query.partition(':')
+    if sep and term.strip():
+        wanted = name.strip().lower()
+        for index, column in enumerate(columns):
+            if column.strip().lower() == wanted:
+                return index, term.strip()
+    return None, query
+
+
+def _where(user_id, col, term):
+    """WHERE clause and params matching term in a user's cells."""
+    owner = f'owner:{quote(_owner(user_id))}'
+    if len(term) >= MIN_TRIGRAM_LENGTH:
+        clause = f"{SEARCH_TABLE} MATCH %s"
+        params = [f'{owner} AND text:{quote(term)}']
+    else:
+        clause = f"{SEARCH_TABLE} MATCH %s AND text LIKE %s {LIKE_ESCAPE}"
+        params = [owner, like_contains(term)]
+    if col is not None:
+        clause += " AND col = %s"
+        params.append(col)
+    return clause, params
+
+
+def scan_positions(df, term, col=None):
+    """
+    0-based positions (newest first) of the rows of df containing term.
+    Matches are accumulated column by column into one boolean mask instead of
+    converting the whole frame to strings.
+    """
+    columns = [df.iloc[:, col]] if col is not None else [column for _, column in df.items()]
+    mask = np.zeros(len(df), dtype=bool)
+    for column in columns:
+        if column.dtype != object:
+            column = column.astype(str).where(column.notna())
+        mask |= column.str.contains(term, case=False, na=False, regex=False).to_numpy(dtype=bool)
+    return np.flatnonzero(mask)[::-1]
+
+
+def _scan_row_numbers(sheet_id, col, term):
+    """Fallback: row numbers (newest first) of cached sheet rows containing term, as an array."""
+    return scan_positions(get_report(sheet_id).df, term, col) + 1
+
+
+def search_page(user, sync_state, query, offset, limit):
+    """
+    Ranked search over a user's report rows.
+    Returns (total matching rows, row numbers of the requested page).
+    """
+    col, term = parse_query(query, sync_state.columns)
+
+    if not search_available():
+        row_numbers = _scan_row_numbers(sync_state.sheet_id, col, term)
+        return int(row_numbers.size), row_numbers[offset:offset + limit].tolist()
+
+    where, params = _where(user.id, col, term)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(DISTINCT row_number) FROM {SEARCH_TABLE} WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        if not limit:
+            return total, []
+        # Best matching cell (bm25 rank) decides the row's rank; ties show newest first
+        cursor.execute(
+            f"SELECT row_number FROM (SELECT row_number, rank AS score FROM {SEARCH_TABLE} WHERE {where}) "
+            "GROUP BY row_number ORDER BY MIN(score), row_number DESC LIMIT %s OFFSET %s",
+            params + [limit, offset],
+        )
+        row_numbers = [row[0] for row in cursor.fetchall()]
+    return total, row_numbers
+
+
+def matching_row_numbers(user, sync_state, query):
+    """Row numbers (newest first) of every report row matching query."""
+    col, term = parse_query(query, sync_state.columns)
+
+    if not search_available():
+        return _scan_row_numbers(sync_state.sheet_id, col, term).tolist()
+
+    where, params = _where(user.id, col, term)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT row_number FROM {SEARCH_TABLE} WHERE {where} ORDER BY row_number DESC",
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fetch_rows(user, row_numbers):
+    """Cell values of the given rows, in the order of row_numbers."""
+    rows = dict(
+        ReportRow.objects.filter(user=user, row_number__in=row_numbers).values_list('row_number', 'data')
+    )
+    return [rows[number] for number in row_numbers if number in rows]
+
+
+class SearchResults:
+    """
+    Lazy, sliceable search result for Paginator: counting and slicing run one
+    index query each and only the rows of the requested page are loaded.
+    """
+
+    def __init__(self, user, sync_state, query):
+        self.user = user
+        self.sync_state = sync_state
+        self.query = query
+        self._total = None
+
+    def count(self):
+        if self._total is None:
+            self._total, _ = search_page(self.user, self.sync_state, self.query, 0, 0)
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        self._total, row_numbers = search_page(self.user, self.sync_state, self.query, start, max(0, stop - start))
+        return fetch_rows(self.user, row_numbers)
@@ -0,0 +1,118 @@
+"""
+Incremental sync of Google Sheet reports into the local ReportRow table.
+
+Report sheets only grow as the agent logs conversations, so after the first
+full import each refresh appends just the rows past the last synced row.
+A hash of all synced rows detects edits or deletions anywhere in the sheet,
+in which case the user's rows are rebuilt from scratch. The search index in
+accounts.report_search is kept in step with the table.
+
+Only the database side is incremental: the sheet itself is still exported in
+full (through the shared accounts.report_cache copy, at most once per
+REPORT_CACHE_TTL), because the content version of the whole export drives the
+report ETags and the SSE feed. Syncs that find the same version as last time
+return without touching the table.
+"""
+import hashlib
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+import pandas as pd
+
+from .models import ReportRow, ReportSync
+from .report_cache import get_report
+from .report_search import clear_index, index_rows
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _row_hashes(df):
+    """One 64-bit hash per row of df, computed in a single vectorised pass."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _rows_hash(row_hashes, row_count):
+    """Hash of the first row_count rows, from _row_hashes()."""
+    return hashlib.sha1(row_hashes[:row_count].tobytes()).hexdigest()
+
+
+def _build_rows(user, df, first_row_number):
+    """ReportRow objects for every row of df, numbered from first_row_number."""
+    values = df.fillna('').values.tolist()
+    return [
+        ReportRow(user=user, row_number=first_row_number + offset, data=row)
+        for offset, row in enumerate(values)
+    ]
+
+
+def store_rows(user, df, first_row_number=1):
+    """
+    Insert and index every row of df for user, BATCH_SIZE rows at a time, so
+    only one batch is ever converted to Python objects.
+    """
+    for start in range(0, len(df), BATCH_SIZE):
+        batch = _build_rows(user, df.iloc[start:start + BATCH_SIZE], first_row_number + start)
+        # Conflicts only arise when two requests append the same rows concurrently
+        ReportRow.objects.bulk_create(batch, ignore_conflicts=True)
+        index_rows(user.id, ((row.row_number, row.data) for row in batch))
+
+
+def sync_report(user, sheet_id):
+    """
+    Bring the user's ReportRow table up to date with their Google Sheet.
+    Returns the user's ReportSync state.
+    """
+    report = get_report(sheet_id)
+    state, _ = ReportSync.objects.get_or_create(user=user)
+
+    # Same download as last time, nothing to do
+    if state.sheet_id == sheet_id and state.version == report.version:
+        return state
+
+    df = report.df
+    columns = [str(col) for col in df.columns]
+    row_count = len(df)
+    row_hashes = _row_hashes(df)
+
+    # Every row synced so far must be unchanged, not just the last few
+    appendable = (
+        state.sheet_id == sheet_id
+        and state.columns == columns
+        and row_count >= state.row_count
+        and _rows_hash(row_hashes, state.row_count) == state.rows_hash
+    )
+
+    synced = {
+        'sheet_id': sheet_id,
+        'columns': columns,
+        'row_count': row_count,
+        'rows_hash': _rows_hash(row_hashes, row_count),
+        'version': report.version,
+        'synced_at': timezone.now(),
+    }
+    with transaction.atomic():
+        # Claim the sync by moving the state on from what was read above. A
+        # concurrent sync of the same user blocks on this row until we commit,
+        # then matches nothing and leaves the rows alone.
+        claimed = ReportSync.objects.filter(
+            pk=state.pk, sheet_id=state.sheet_id, row_count=state.row_count, version=state.version,
+        ).update(**synced)
+        if not claimed:
+            state.refresh_from_db()
+            return state
+
+        if appendable:
+            store_rows(user, df.iloc[state.row_count:], state.row_count + 1)
+        else:
+            logger.info(f'Full report resync for {user.email} ({row_count} rows)')
+            ReportRow.objects.filter(user=user).delete()
+            clear_index(user.id)
+            store_rows(user, df)
+
+    for field, value in synced.items():
+        setattr(state, field, value)
+    return state
+
@@ -0,0 +1,128 @@
+"""
+Model signal handlers for the accounts app. Connected in AccountsConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .admin_stats import invalidate_admin_stats
+from .config_cache import bump_config_version, refresh_config_payload
+from .config_events import record_config_changed, record_event, webhooks_enabled
+from .models import AIAgentConfig, BlockedPost, CustomUser, UserProfile, hand_over_email_prefix
+from .user_search import index_user, remove_user
+
+
+@receiver(post_delete, sender=CustomUser)
+def email_prefix_released(sender, instance, **kwargs):
+    # Another account with the same part before the @ takes over the prefix
+    if instance.email_prefix:
+        hand_over_email_prefix(instance.email_prefix)
+
+
+def config_changed(user_id):
+    """Invalidate a user's cached config now and rebuild its snapshot once committed."""
+    bump_config_version(user_id)
+    transaction.on_commit(lambda: refresh_config_payload(user_id))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_config_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which is not part of the config
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    config_changed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=AIAgentConfig)
+def related_config_changed(sender, instance, **kwargs):
+    config_changed(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=BlockedPost)
+def blocked_post_changed(sender, instance, **kwargs):
+    user_id = AIAgentConfig.objects.filter(pk=instance.config_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        config_changed(user_id)
+
+
+# Outbox events for the config change webhooks (see accounts.config_events)
+
+@receiver(post_save, sender=AIAgentConfig)
+def announce_config_saved(sender, instance, **kwargs):
+    if webhooks_enabled():
+        record_config_changed(instance.user)
+
+
+@receiver([post_save, post_delete], sender=BlockedPost)
+def announce_blocked_post_changed(sender, instance, **kwargs):
+    if webhooks_enabled():
+        user = CustomUser.objects.filter(ai_config__pk=instance.config_id).first()
+        if user is not None:
+            record_config_changed(user)
+
+
+STATUS_FIELDS = ('kyc_status', 'subscription_expiry', 'package_name')
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_profile_status(sender, instance, **kwargs):
+    # Compared in post_save to detect KYC and subscription transitions
+    if not webhooks_enabled():
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = UserProfile.objects.filter(pk=instance.pk).values_list(*STATUS_FIELDS).first()
+    if previous is None:
+        previous = tuple(UserProfile._meta.get_field(field).get_default() for field in STATUS_FIELDS)
+    instance._previous_status = previous
+
+
+@receiver(post_save, sender=UserProfile)
+def announce_profile_status(sender, instance, **kwargs):
+    previous_status = getattr(instance, '_previous_status', None)
+    if previous_status is None:
+        return
+    instance._previous_status = None
+    kyc_status, subscription_expiry, package_name = previous_status
+    if instance.kyc_status != kyc_status:
+        record_event(instance.user, 'kyc_changed', {
+            'kyc_status': instance.kyc_status,
+            'previous_kyc_status': kyc_status,
+        })
+    if instance.subscription_expiry != subscription_expiry or instance.package_name != package_name:
+        record_event(instance.user, 'subscription_changed', {
+            'subscription_expiry': instance.subscription_expiry.isoformat() if instance.subscription_expiry else None,
+            'package_name': instance.package_name,
+        })
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=AIAgentConfig)
+def admin_stats_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no admin counter uses
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_admin_stats()
+
+
+# Admin user search index (see accounts.user_search)
+
+@receiver(post_save, sender=CustomUser)
+def user_search_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'email' not in update_fields:
+        return
+    index_user(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_search_deleted(sender, instance, **kwargs):
+    remove_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_search_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'name', 'mobile_number'} & set(update_fields):
+        return
+    index_user(instance.user_id)
@@ -0,0 +1,41 @@
+"""
+Streaming responses that stay streaming under ASGI.
+
+Served through the ASGI handler, a StreamingHttpResponse over a synchronous
+iterator is consumed in full before anything is sent, so a large download
+sits in worker memory. streaming_content() hands such responses an async
+iterator instead: parts are pulled from the synchronous iterator in batches
+in the thread-sensitive sync thread (where its database cursor lives), and
+each batch is sent as one chunk. WSGI requests keep the plain iterator.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Parts pulled from the synchronous iterator per thread hop
+BATCH_SIZE = 500
+
+
+async def aiter_batches(iterator, batch_size=BATCH_SIZE):
+    """Async iterator over iterator's parts (all str or all bytes), batch_size parts joined per chunk."""
+    iterator = iter(iterator)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    try:
+        while True:
+            batch = await next_batch()
+            if not batch:
+                break
+            yield type(batch[0])().join(batch)
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            # Releases the iterator's cursor if the client went away mid-stream
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterator, batch_size=BATCH_SIZE):
+    """iterator as streaming content for request: async under ASGI, unchanged under WSGI."""
+    if isinstance(request, ASGIRequest):
+        return aiter_batches(iterator, batch_size)
+    return iterator
@@ -1,3 +1,640 @@
-from django.test import TestCase
+from datetime import timedelta
+from importlib import import_module
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    AsyncClient, AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+import pandas as pd
+import requests
+
+from . import config_events, facebook_comments, report_sync
+from .forms import CustomUserCreationForm
+from .middleware import SESSION_KEY
+from .models import AIAgentConfig, BlockedPost, ConfigEvent, ConfigEventState, CustomUser, ReportRow, ReportSync, UserProfile
+from .report_cache import CachedReport
+from .report_export import export_report
+from .report_search import SearchResults, search_available
+from .user_search import search_users
+
+backfill_email_prefix = import_module('accounts.migrations.0013_customuser_email_prefix').backfill_email_prefix
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class EmailPrefixTests(TestCase):
+    def test_backfill_oldest_account_keeps_shared_prefix(self):
+        first = CustomUser.objects.create_user('alice@example.com')
+        second = CustomUser.objects.create_user('Alice@example.org')
+        other = CustomUser.objects.create_user('bob@example.com')
+        CustomUser.objects.update(email_prefix=None)
+
+        backfill_email_prefix(apps, None)
+
+        prefixes = dict(CustomUser.objects.values_list('pk', 'email_prefix'))
+        self.assertEqual(prefixes[first.pk], 'alice')
+        self.assertIsNone(prefixes[second.pk])
+        self.assertEqual(prefixes[other.pk], 'bob')
+
+    def test_new_account_with_taken_prefix_gets_none(self):
+        first = CustomUser.objects.create_user('alice@example.com')
+        second = CustomUser.objects.create_user('ALICE@example.org')
+
+        self.assertEqual(first.email_prefix, 'alice')
+        self.assertIsNone(second.email_prefix)
+        self.assertEqual(CustomUser.objects.get_by_email_prefix('Alice'), first)
+
+    def test_prefix_freed_by_email_change_can_be_claimed(self):
+        first = CustomUser.objects.create_user('alice@example.com')
+        first.email = 'carol@example.com'
+        first.save()
+        second = CustomUser.objects.create_user('alice@example.org')
+
+        self.assertEqual(second.email_prefix, 'alice')
+
+    @override_settings(CACHES=LOCMEM_CACHES, API_ADMIN_PASSWORD='secret')
+    def test_released_prefix_goes_to_the_oldest_matching_account(self):
+        first = CustomUser.objects.create_user('alice@example.com')
+        second = CustomUser.objects.create_user('Alice@example.org')
+        third = CustomUser.objects.create_user('alice@example.net')
+        AIAgentConfig.objects.create(user=second, facebook_page_id='222')
+
+        first.email = 'carol@example.com'
+        first.save()
+
+        second.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual(second.email_prefix, 'alice')
+        self.assertIsNone(third.email_prefix)
+        self.assertEqual(CustomUser.objects.get_by_email_prefix('alice'), second)
+        response = self.client.get(reverse('api_user_config', args=['secret', 'alice', 'fb_page_id']))
+        self.assertEqual(response.content, b'222')
+
+    def test_deleted_account_releases_its_prefix(self):
+        first = CustomUser.objects.create_user('alice@example.com')
+        second = CustomUser.objects.create_user('alice@example.org')
+
+        first.delete()
+
+        second.refresh_from_db()
+        self.assertEqual(second.email_prefix, 'alice')
+
+
+    def test_registration_allows_a_taken_prefix(self):
+        CustomUser.objects.create_user('john@gmail.com')
+        form = CustomUserCreationForm(data={
+            'full_name': 'John', 'email': 'john@yahoo.com', 'phone_number': '0123456789',
+            'password1': 'a-long-passphrase', 'password2': 'a-long-passphrase',
+        })
+
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.save().email_prefix)
+
+
+class BlockedPostMigrationTests(TransactionTestCase):
+    before = [('accounts', '0013_customuser_email_prefix')]
+    after = [('accounts', '0014_blocked_posts')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_blocked_post_ids_become_rows(self):
+        old_apps = self.migrate(self.before)
+        user = old_apps.get_model('accounts', 'CustomUser').objects.create(email='alice@example.com')
+        config = old_apps.get_model('accounts', 'AIAgentConfig').objects.create(
+            user=user,
+            blocked_post_ids='123_456\n  789_012 \n\n123_456\n' + 'x' * 300,
+        )
+
+        new_apps = self.migrate(self.after)
+        post_ids = list(
+            new_apps.get_model('accounts', 'BlockedPost').objects
+            .filter(config_id=config.pk).order_by('id').values_list('post_id', flat=True)
+        )
+
+        self.assertEqual(post_ids, ['123_456', '789_012', 'x' * 255])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, API_ADMIN_PASSWORD='secret')
+class ConfigEtagTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        UserProfile.objects.create(user=self.user, subscription_expiry=timezone.now() + timezone.timedelta(days=7))
+        self.config = AIAgentConfig.objects.create(user=self.user, facebook_page_id='111')
+
+    def get(self, field, etag=None):
+        url = reverse('api_user_config', args=['secret', 'alice', field])
+        if etag is None:
+            return self.client.get(url)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_config_is_not_modified(self):
+        etag = self.get('fb_page_id')['ETag']
+
+        self.assertEqual(self.get('fb_page_id', etag).status_code, 304)
+
+    def test_etag_changes_after_config_save(self):
+        etag = self.get('fb_page_id')['ETag']
+
+        self.config.facebook_page_id = '222'
+        self.config.save()
+        response = self.get('fb_page_id', etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'222')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_after_blocked_post_added(self):
+        etag = self.get('all')['ETag']
+
+        BlockedPost.objects.create(config=self.config, post_id='123_456')
+        response = self.get('all', etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('123_456', response.json()['blocked_post_ids'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportDataEtagTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        UserProfile.objects.create(user=self.user, kyc_status='VERIFIED')
+        AIAgentConfig.objects.create(user=self.user, google_sheet_id='sheet')
+        self.client.force_login(self.user)
+
+    def get(self, report, etag=None):
+        headers = {} if etag is None else {'HTTP_IF_NONE_MATCH': etag}
+        # Only report_sync sees the sheet: the worker's report cache stays cold,
+        # so the check before the view cannot answer
+        with mock.patch.object(report_sync, 'get_report', return_value=report):
+            return self.client.get(reverse('report_data_api'), **headers)
+
+    def test_unchanged_sheet_is_not_modified_after_the_sync(self):
+        report = CachedReport('sheet', pd.DataFrame({'name': ['a', 'b']}), 'v1')
+        etag = self.get(report)['ETag']
+
+        self.assertEqual(self.get(report, etag).status_code, 304)
+
+    def test_changed_sheet_returns_the_new_rows(self):
+        etag = self.get(CachedReport('sheet', pd.DataFrame({'name': ['a', 'b']}), 'v1'))['ETag']
+
+        response = self.get(CachedReport('sheet', pd.DataFrame({'name': ['a', 'b', 'c']}), 'v2'), etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_records'], 3)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The user search index needs SQLite FTS5')
+
+    def search(self, query, queryset=None):
+        results = search_users(query, queryset if queryset is not None else CustomUser.objects.all())
+        return None if results is None else [user.pk for user in results[:len(results)]]
+
+    def test_email_matches_rank_first(self):
+        by_name = CustomUser.objects.create_user('zed@example.com')
+        UserProfile.objects.create(user=by_name, name='Marta')
+        by_email = CustomUser.objects.create_user('marta@example.com')
+        UserProfile.objects.create(user=by_email, name='Someone')
+        CustomUser.objects.create_user('bob@example.com')
+
+        self.assertEqual(self.search('mart'), [by_email.pk, by_name.pk])
+
+    def test_short_terms_narrow_the_match(self):
+        alice = CustomUser.objects.create_user('alice@example.com')
+        CustomUser.objects.create_user('alicia@example.org')
+
+        self.assertEqual(self.search('ali ce'), [alice.pk])
+        self.assertIsNone(self.search('al'))
+
+    def test_list_filters_apply_before_paging(self):
+        users = [CustomUser.objects.create_user(f'user{i}@shop.com') for i in range(45)]
+        inactive = users[3]
+        inactive.is_active = False
+        inactive.save()
+
+        results = search_users('shop.com', CustomUser.objects.all())
+        page = Paginator(results, 20).get_page(3)
+
+        self.assertEqual(results.count(), 45)
+        self.assertEqual(len(page.object_list), 5)
+        self.assertEqual(self.search('shop.com', CustomUser.objects.filter(is_active=False)), [inactive.pk])
+
+    def test_profile_lists_search_by_user(self):
+        alice = CustomUser.objects.create_user('alice@example.com')
+        profile = UserProfile.objects.create(user=alice, name='Alice')
+
+        results = search_users('alice', UserProfile.objects.all(), user_field='user_id')
+
+        self.assertEqual(list(results[0:1]), [profile])
+
+
+def sheet(values, version):
+    """A parsed report as returned by report_cache.get_report(), one column per row value."""
+    return CachedReport('sheet', pd.DataFrame({'name': values, 'note': [f'note {value}' for value in values]}), version)
+
+
+class ReportSyncTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+
+    def sync(self, report):
+        with mock.patch.object(report_sync, 'get_report', return_value=report):
+            return report_sync.sync_report(self.user, 'sheet')
+
+    def stored(self):
+        rows = ReportRow.objects.filter(user=self.user).order_by('row_number')
+        return [row.data[0] for row in rows]
+
+    def test_new_rows_are_appended(self):
+        names = [f'row {i}' for i in range(100)]
+        self.sync(sheet(names, 'v1'))
+        first_ids = list(ReportRow.objects.filter(user=self.user).order_by('row_number').values_list('pk', flat=True))
+
+        state = self.sync(sheet(names + ['row 100', 'row 101'], 'v2'))
+
+        self.assertEqual(state.row_count, 102)
+        self.assertEqual(self.stored(), names + ['row 100', 'row 101'])
+        # The existing rows were kept, not rebuilt
+        self.assertEqual(
+            list(ReportRow.objects.filter(user=self.user, row_number__lte=100).order_by('row_number').values_list('pk', flat=True)),
+            first_ids,
+        )
+
+    def test_edit_to_an_old_row_triggers_a_full_resync(self):
+        names = [f'row {i}' for i in range(100)]
+        self.sync(sheet(names, 'v1'))
+
+        names[0] = 'edited'
+        state = self.sync(sheet(names, 'v2'))
+
+        self.assertEqual(state.version, 'v2')
+        self.assertEqual(self.stored(), names)
+
+    def test_deleted_row_triggers_a_full_resync(self):
+        names = [f'row {i}' for i in range(100)]
+        self.sync(sheet(names, 'v1'))
+
+        del names[10]
+        self.sync(sheet(names + ['row 100'], 'v2'))
+
+        self.assertEqual(self.stored(), names + ['row 100'])
+
+    def test_unchanged_version_skips_the_sync(self):
+        self.sync(sheet(['a', 'b'], 'v1'))
+
+        # Same version: the content is trusted to be unchanged
+        self.sync(sheet(['x', 'y', 'z'], 'v1'))
+
+        self.assertEqual(self.stored(), ['a', 'b'])
+
+
+class ReportSearchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        self.state = self.sync(self.user, sheet(['Rahim Dhaka', 'Karim Sylhet', 'Rahima Dhaka'], 'v1'))
+
+    def sync(self, user, report):
+        with mock.patch.object(report_sync, 'get_report', return_value=report):
+            return report_sync.sync_report(user, 'sheet')
+
+    def search(self, query, user=None):
+        results = SearchResults(user or self.user, self.state, query)
+        return [row[0] for row in Paginator(results, 10).page(1)]
+
+    def test_substring_match_counts_and_pages(self):
+        self.assertTrue(search_available())
+        results = SearchResults(self.user, self.state, 'dhak')
+
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(sorted(row[0] for row in results[0:10]), ['Rahim Dhaka', 'Rahima Dhaka'])
+
+    def test_short_terms_fall_back_to_like(self):
+        self.assertEqual(self.search('ri'), ['Karim Sylhet'])
+
+    def test_column_scoped_query(self):
+        # Every note cell contains "note"; the name cells do not
+        self.assertEqual(self.search('name: note'), [])
+        self.assertEqual(len(self.search('note: note')), 3)
+        self.assertEqual(self.search('Note: sylhet'), ['Karim Sylhet'])
+
+    def test_other_users_rows_are_not_matched(self):
+        bob = CustomUser.objects.create_user('bob@example.com')
+        self.sync(bob, sheet(['Bob Dhaka'], 'v1'))
+
+        self.assertEqual(len(self.search('dhaka')), 2)
+        self.assertEqual(self.search('dhaka', user=bob), ['Bob Dhaka'])
+
+    def test_resync_replaces_indexed_rows(self):
+        self.state = self.sync(self.user, sheet(['Rahim Khulna', 'Karim Sylhet', 'Rahima Dhaka'], 'v2'))
+
+        self.assertEqual(self.search('rahim '), ['Rahim Khulna'])
+        self.assertEqual(self.search('dhaka'), ['Rahima Dhaka'])
+
+
+def graph_response(body, status=200):
+    """A requests.Response from Graph with the given JSON (or raw text) body."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = (body if isinstance(body, str) else json.dumps(body)).encode()
+    return response
+
+
+def graph_item(code, body=None):
+    """One operation result of a Graph batch response."""
+    return {'code': code, 'body': json.dumps(body or {})}
+
+
+class GraphBatchDeleteTests(SimpleTestCase):
+    def delete(self, comment_ids, response):
+        with mock.patch.object(facebook_comments.http_client, 'post', return_value=response) as post:
+            results = facebook_comments.delete_comments(comment_ids, 'token')
+        return results, post
+
+    def test_results_are_matched_to_ids_in_order(self):
+        results, _ = self.delete(['1_1', '1_2', '1_3', '1_4'], graph_response([
+            graph_item(200, {'success': True}),
+            graph_item(400, {'error': {'message': 'Comment already deleted'}}),
+            None,
+            graph_item(500, 'not json'),
+        ]))
+
+        self.assertEqual(results, [
+            {'id': '1_1', 'deleted': True, 'error': None},
+            {'id': '1_2', 'deleted': False, 'error': 'Comment already deleted'},
+            {'id': '1_3', 'deleted': False, 'error': 'Not processed by Facebook, please retry'},
+            {'id': '1_4', 'deleted': False, 'error': 'Unknown error'},
+        ])
+
+    def test_invalid_ids_are_never_sent(self):
+        results, post = self.delete(['1_1', 'abc'], graph_response([graph_item(200)]))
+
+        sent = json.loads(post.call_args.kwargs['data']['batch'])
+        self.assertEqual([operation['relative_url'] for operation in sent], ['1_1'])
+        self.assertEqual(results[1], {'id': 'abc', 'deleted': False, 'error': 'Invalid comment ID'})
+
+    def test_unexpected_responses_fail_every_id(self):
+        cases = {
+            'non-JSON body': (graph_response('<html>Bad gateway</html>'), 'Unexpected response from Facebook, please retry'),
+            'top-level error': (graph_response({'error': {'message': 'Token expired'}}), 'Token expired'),
+            'length mismatch': (graph_response([graph_item(200)]), 'Unexpected response from Facebook, please retry'),
+            'HTTP error': (graph_response({'error': {'message': 'Rate limited'}}, status=429), 'Rate limited'),
+        }
+        for name, (response, error) in cases.items():
+            with self.subTest(name):
+                results, _ = self.delete(['1_1', '1_2'], response)
+                self.assertEqual([result['error'] for result in results], [error, error])
+                self.assertFalse(any(result['deleted'] for result in results))
+
+    def test_connection_error_fails_every_id(self):
+        with mock.patch.object(facebook_comments.http_client, 'post', side_effect=requests.ConnectionError('refused')):
+            results = facebook_comments.delete_comments(['1_1', '1_2'], 'token')
+
+        self.assertEqual([result['error'] for result in results], ['refused', 'refused'])
+
+    def test_ids_are_split_into_graph_sized_batches(self):
+        comment_ids = [f'1_{i}' for i in range(facebook_comments.GRAPH_BATCH_SIZE + 1)]
+
+        def post(url, data):
+            count = len(json.loads(data['batch']))
+            return graph_response([graph_item(200)] * count)
+
+        with mock.patch.object(facebook_comments.http_client, 'post', side_effect=post) as patched:
+            results = facebook_comments.delete_comments(comment_ids, 'token')
+
+        self.assertEqual(patched.call_count, 2)
+        self.assertTrue(all(result['deleted'] for result in results))
+
+
+class ConfigEventTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(config_events, 'CONFIG_WEBHOOK_URL', 'http://hooks.test/config')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        self.profile = UserProfile.objects.create(user=self.user)
+
+    def events(self):
+        return list(ConfigEvent.objects.values_list('event_type', 'data'))
+
+    def test_profile_transitions_are_announced(self):
+        ConfigEvent.objects.all().delete()
+        profile = UserProfile.objects.get(pk=self.profile.pk)
+        profile.kyc_status = 'VERIFIED'
+        profile.save()
+        profile.name = 'Alice'
+        profile.save()
+
+        self.assertEqual(self.events(), [
+            ('kyc_changed', {'kyc_status': 'VERIFIED', 'previous_kyc_status': 'NONE'}),
+        ])
+
+    def test_deferred_profiles_load_and_save(self):
+        ConfigEvent.objects.all().delete()
+        profile = UserProfile.objects.only('name').get(pk=self.profile.pk)
+        profile.package_name = '30 Days Package'
+        profile.save(update_fields=['package_name'])
+
+        self.assertEqual([event_type for event_type, _ in self.events()], ['subscription_changed'])
+
+    def test_failed_event_rolls_back_the_change(self):
+        config = AIAgentConfig.objects.create(user=self.user, system_prompt='old')
+        config.system_prompt = 'new'
+
+        with mock.patch.object(config_events.ConfigEvent.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                config.save()
+
+        self.assertEqual(AIAgentConfig.objects.get(pk=config.pk).system_prompt, 'old')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConfigEventDispatchTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(config_events, 'CONFIG_WEBHOOK_URL', 'http://hooks.test/config')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        ConfigEvent.objects.all().delete()
+        config_events.record_config_changed(self.user)
+        self.event = ConfigEvent.objects.get()
+
+    def dispatch(self, status):
+        with mock.patch.object(config_events.http_client, 'post', return_value=graph_response({}, status)) as post:
+            result = config_events.dispatch_events()
+        self.event.refresh_from_db()
+        return result, post
+
+    def test_delivered_events_are_marked_sent(self):
+        result, post = self.dispatch(204)
+
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(self.event.status, 'sent')
+        body = json.loads(post.call_args.kwargs['data'])
+        self.assertEqual([(event['id'], event['email_prefix']) for event in body['events']], [(self.event.pk, 'alice')])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        before = timezone.now()
+        result, _ = self.dispatch(500)
+
+        self.assertEqual(result, (0, 1))
+        self.assertEqual((self.event.status, self.event.attempts), ('retry', 1))
+        self.assertTrue(self.event.last_error.startswith('HTTP 500'))
+        self.assertGreaterEqual(self.event.next_attempt_at, before + config_events.RETRY_BASE)
+
+        # Not due yet: nothing is sent
+        self.assertEqual(self.dispatch(204)[0], (0, 0))
+        self.assertEqual(self.event.status, 'retry')
+
+        ConfigEvent.objects.update(next_attempt_at=timezone.now())
+        self.dispatch(500)
+        self.assertEqual(self.event.attempts, 2)
+        self.assertGreaterEqual(self.event.next_attempt_at, timezone.now() + config_events.RETRY_BASE)
+
+    def test_event_fails_after_max_attempts(self):
+        ConfigEvent.objects.update(status='retry', attempts=config_events.MAX_ATTEMPTS - 1)
+
+        self.dispatch(500)
+
+        self.assertEqual((self.event.status, self.event.attempts), ('failed', config_events.MAX_ATTEMPTS))
+        self.assertIsNone(config_events.dispatch_batch())
+
+    def test_events_left_sending_by_a_crashed_dispatcher_are_resent(self):
+        ConfigEvent.objects.update(status='sending', next_attempt_at=timezone.now() + config_events.SENDING_LEASE)
+        self.assertEqual(self.dispatch(204)[0], (0, 0))
+
+        ConfigEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.dispatch(204)[0], (1, 0))
+        self.assertEqual(self.event.status, 'sent')
+
+    def test_dispatch_lease(self):
+        lease = timedelta(minutes=1)
+
+        self.assertTrue(config_events.acquire_dispatch_lease('a', lease))
+        self.assertFalse(config_events.acquire_dispatch_lease('b', lease))
+        # The holder can renew its own lease
+        self.assertTrue(config_events.acquire_dispatch_lease('a', lease))
+
+        config_events.release_dispatch_lease('b')
+        self.assertFalse(config_events.acquire_dispatch_lease('b', lease))
+        config_events.release_dispatch_lease('a')
+        self.assertTrue(config_events.acquire_dispatch_lease('b', lease))
+
+        # An expired lease can be taken over
+        ConfigEventState.objects.update(locked_until=timezone.now() - lease)
+        self.assertTrue(config_events.acquire_dispatch_lease('a', lease))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SubscriptionGateTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        self.profile = UserProfile.objects.create(user=self.user, subscription_expiry=timezone.now() + timedelta(days=1))
+        self.client.force_login(self.user)
+
+    def get(self):
+        return self.client.get(reverse('kyc_required'))
+
+    def assertExpired(self, response):
+        self.assertRedirects(response, reverse('subscription_expired'), fetch_redirect_response=False)
+
+    def test_active_subscription_is_remembered_in_the_session(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.assertIn(SESSION_KEY, self.client.session)
+
+        # A change that does not go through save() keeps the session answer
+        UserProfile.objects.filter(pk=self.profile.pk).update(subscription_expiry=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_expired_subscription_is_redirected(self):
+        UserProfile.objects.filter(pk=self.profile.pk).update(subscription_expiry=timezone.now() - timedelta(days=1))
+
+        self.assertExpired(self.get())
+        self.assertEqual(self.client.get(reverse('subscription_expired')).status_code, 200)
+
+    def test_profile_save_rechecks_the_subscription(self):
+        self.get()
+
+        self.profile.subscription_expiry = timezone.now() - timedelta(days=1)
+        self.profile.save()
+        self.assertExpired(self.get())
+
+        self.profile.subscription_expiry = timezone.now() + timedelta(days=30)
+        self.profile.save()
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_stored_expiry_passing_rechecks_the_subscription(self):
+        self.get()
+        session = self.client.session
+        session[SESSION_KEY] = {**session[SESSION_KEY], 'expiry': timezone.now().timestamp() - 1}
+        session.save()
+
+        # Renewed without a profile save: the re-check finds the new expiry
+        self.assertEqual(self.get().status_code, 200)
+        self.assertGreater(self.client.session[SESSION_KEY]['expiry'], timezone.now().timestamp())
+
+
+async def read_async(response):
+    return b''.join([chunk async for chunk in response.streaming_content])
+
+
+class ReportExportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('alice@example.com')
+        self.state = ReportSync.objects.create(user=self.user, sheet_id='sheet', columns=['name', 'city'], row_count=3)
+        ReportRow.objects.bulk_create(
+            ReportRow(user=self.user, row_number=i, data=[f'name {i}', 'Dhaka']) for i in range(1, 4)
+        )
+
+    def request(self, factory):
+        request = factory.get('/report/')
+        request.user = self.user
+        return request
+
+    def test_wsgi_csv_is_a_plain_stream(self):
+        response = export_report(self.request(RequestFactory()), self.state, fmt='csv')
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode('utf-8-sig').splitlines(),
+            ['name,city', 'name 3,Dhaka', 'name 2,Dhaka', 'name 1,Dhaka'],
+        )
+
+    async def test_asgi_downloads_stream_asynchronously(self):
+        request = self.request(AsyncRequestFactory())
+
+        for fmt in ('csv', 'ndjson', 'xlsx'):
+            with self.subTest(fmt=fmt):
+                response = await sync_to_async(export_report)(request, self.state, fmt=fmt)
+                self.assertTrue(response.is_async)
+                content = await read_async(response)
+                self.assertTrue(content)
+
+        ndjson = await read_async(await sync_to_async(export_report)(request, self.state, fmt='ndjson'))
+        self.assertEqual(json.loads(ndjson.splitlines()[0]), {'name': 'name 3', 'city': 'Dhaka'})
+
+    @override_settings(CACHES=LOCMEM_CACHES, API_ADMIN_PASSWORD='secret')
+    async def test_asgi_bulk_config_ndjson_streams_asynchronously(self):
+        url = reverse('api_bulk_config', args=['secret']) + '?prefixes=alice,nobody&format=ndjson'
+
+        response = await AsyncClient().get(url)
+
+        self.assertTrue(response.is_async)
+        lines = [json.loads(line) for line in (await read_async(response)).splitlines()]
+        self.assertEqual([line['prefix'] for line in lines], ['alice', 'nobody'])
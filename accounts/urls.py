@@ -1,7 +1,7 @@
 from django.urls import path
 from . import views
 from . import admin_views
-from .api_views import api_get_user_config
+from .api_views import api_get_bulk_config, api_get_user_config, api_is_post_blocked
 
 urlpatterns = [
     # Custom Admin URLs
@@ -11,6 +11,7 @@ urlpatterns = [
     path('portal/admin/kyc/', admin_views.admin_kyc_list, name='admin_kyc_list'),
     path('portal/admin/kyc/action/', admin_views.admin_kyc_action, name='admin_kyc_action'),
     path('portal/admin/subscriptions/', admin_views.admin_subscription_list, name='admin_subscription_list'),
+    path('portal/admin/stats/', admin_views.admin_stats, name='admin_stats'),
 
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
@@ -20,17 +21,23 @@ urlpatterns = [
     path('profile/privacy_policy/<str:email_prefix>/', views.privacy_policy_view, name='privacy_policy'),
 
     path('ai-agent/', views.ai_agent_view, name='ai_agent'),
+    path('ai-agent/blocked-posts/', views.blocked_posts_api, name='blocked_posts'),
 
     path('feed/', views.feed_view, name='feed'),
+    path('feed/more/', views.feed_more_api, name='feed_more'),
     path('create-post/', views.create_post_view, name='create_post'),
     path('report/', views.report_view, name='report'),
     path('report-data/', views.report_data_api, name='report_data_api'),
+    path('report-events/', views.report_events, name='report_events'),
     path('delete-comment/', views.delete_comment_view, name='delete_comment'),
+    path('delete-comments/', views.bulk_delete_comments_api, name='bulk_delete_comments'),
     path('kyc-required/', views.kyc_required_view, name='kyc_required'),
 
     
     # API endpoints
+    path('api/user/<str:admin_password>/<str:email_prefix>/is_blocked/<str:post_id>/', api_is_post_blocked, name='api_is_post_blocked'),
     path('api/user/<str:admin_password>/<str:email_prefix>/<str:field>/', api_get_user_config, name='api_user_config'),
+    path('api/users/<str:admin_password>/', api_get_bulk_config, name='api_bulk_config'),
     
     # Subscription
     path('subscription-expired/', views.subscription_expired, name='subscription_expired'),
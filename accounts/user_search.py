@@ -0,0 +1,136 @@
+"""
+Indexed search for the custom admin user and subscription lists.
+
+On SQLite each user's email, profile name and mobile number are mirrored into
+an FTS5 table with the trigram tokenizer, one row per user (rowid = user ID).
+That gives case-insensitive substring matching ranked with bm25 (email
+matches first, then name, then mobile number), instead of a leading-wildcard
+LIKE over the users/profiles join. accounts.signals keeps the index in step
+with CustomUser and UserProfile saves.
+
+Every whitespace-separated term must match. Terms shorter than three
+characters cannot use the trigram index; queries made only of such terms, and
+databases without FTS5, fall back to the plain icontains filter.
+
+The list's own filters (status, KYC, subscription) are applied inside the
+index query, so counts and pages cover every matching user, with no cap.
+"""
+from django.db import connection
+
+from .fts import LIKE_ESCAPE, MIN_TRIGRAM_LENGTH, like_contains, quote, table_available
+from .models import CustomUser
+
+SEARCH_TABLE = 'accounts_customuser_search'
+
+# bm25 column weights for email, name and mobile_number
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0)
+
+
+def search_available():
+    """Whether the FTS5 user index (migration 0016) exists in the default database."""
+    return table_available(SEARCH_TABLE)
+
+
+def index_user(user_id):
+    """Replace a user's row in the index with their current email, name and mobile number."""
+    if not search_available():
+        return
+    row = CustomUser.objects.filter(pk=user_id).values_list(
+        'email', 'profile__name', 'profile__mobile_number',
+    ).first()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [user_id])
+        if row is not None:
+            email, name, mobile_number = row
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, email, name, mobile_number) VALUES (%s, %s, %s, %s)",
+                [user_id, email, name or '', mobile_number or ''],
+            )
+
+
+def remove_user(user_id):
+    """Remove a deleted user from the index."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [user_id])
+
+
+def _match(query):
+    """
+    WHERE clause and params selecting the index rows that match every term
+    of query, or None when the index cannot answer the query.
+    """
+    terms = [term for term in query.split() if len(term) >= MIN_TRIGRAM_LENGTH]
+    if not search_available() or not terms:
+        return None
+    # Short terms are dropped from MATCH but must still appear
+    short_terms = [term for term in query.split() if len(term) < MIN_TRIGRAM_LENGTH]
+
+    where = f"{SEARCH_TABLE} MATCH %s"
+    params = [' AND '.join(quote(term) for term in terms)]
+    for term in short_terms:
+        where += f" AND (email LIKE %s {LIKE_ESCAPE} OR name LIKE %s {LIKE_ESCAPE} OR mobile_number LIKE %s {LIKE_ESCAPE})"
+        params += [like_contains(term)] * 3
+    return where, params
+
+
+def search_users(query, queryset, user_field='pk'):
+    """
+    The rows of queryset whose user matches query, best match first (ties
+    newest first), as a RankedResults for Paginator. user_field names the
+    user ID of a row ('pk' for users, 'user_id' for profiles). Returns None
+    when the index cannot answer the query.
+    """
+    match = _match(query)
+    if match is None:
+        return None
+    return RankedResults(queryset, user_field, *match)
+
+
+class RankedResults:
+    """
+    Sliceable search result for Paginator. The filters of queryset are
+    applied inside the index query (rowid IN the queryset's user IDs), so
+    counting and ranking only ever see allowed users, and each page loads
+    just its own rows.
+    """
+
+    def __init__(self, queryset, user_field, where, params):
+        self.queryset = queryset
+        self.user_field = user_field
+        ids_sql, ids_params = queryset.order_by().values(user_field).query.sql_with_params()
+        self.where = f"{where} AND rowid IN ({ids_sql})"
+        self.params = [*params, *ids_params]
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {self.where}", self.params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _page_ids(self, offset, limit):
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {self.where} "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid DESC LIMIT %s OFFSET %s",
+                [*self.params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self.count())
+        page_ids = self._page_ids(start, max(0, stop - start))
+        rows = {
+            getattr(row, self.user_field): row
+            for row in self.queryset.filter(**{f'{self.user_field}__in': page_ids})
+        }
+        return [rows[user_id] for user_id in page_ids if user_id in rows]
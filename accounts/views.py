@@ -1,14 +1,26 @@
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, FileResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm, AIAgentConfigForm, KYCUploadForm
 
-from .models import CustomUser, UserProfile, AIAgentConfig
-import pandas as pd
-import io
-import requests
+from .models import CustomUser, UserProfile, AIAgentConfig, BlockedPost, ReportRow
+from .facebook_comments import MAX_BULK_DELETE, delete_comments, parse_comment_ids
+from .facebook_feed import GRAPH_API_URL, GraphError, get_feed_page, get_page_feed, invalidate_page_feed, next_cursor
+from .image_upload import MultipartFile, prepare_image
+from .report_cache import fresh_report_version, invalidate_report
+from .report_events import parse_event_id, report_event_stream
+from .report_export import EXPORT_FORMATS, export_report
+from .report_search import SearchResults
+from .report_sync import sync_report
+from . import http_client
+import hashlib
 
 
 
@@ -18,12 +30,14 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 def report_view(request):
     """Fetch and display report from Google Sheet"""
     # Ensure AI config exists
-    ai_config, created = AIAgentConfig.objects.get_or_create(user=request.user)
+    ai_config = request.user.get_ai_config()
     
     # Handle Sheet ID update
     if request.method == 'POST' and 'google_sheet_id' in request.POST:
         new_id = request.POST.get('google_sheet_id', '').strip()
         if new_id:
+            if new_id != ai_config.google_sheet_id:
+                invalidate_report(ai_config.google_sheet_id)
             ai_config.google_sheet_id = new_id
             ai_config.save()
             messages.success(request, 'Report ID updated successfully!')
@@ -35,48 +49,32 @@ def report_view(request):
     columns = []
     error = None
     page_obj = None
+    report_event_id = ''
     
     if sheet_id:
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            # Read into pandas DataFrame with UTF-8 encoding
-            # Use content (bytes) and BytesIO for better encoding handling
-            df = pd.read_csv(io.BytesIO(response.content), encoding='utf-8')
-            
-            # Filter logic if requested
+            # Bring the local copy of the sheet up to date (appends new rows only)
+            sync_state = sync_report(request.user, sheet_id)
+            columns = sync_state.columns
+            report_event_id = f'{sync_state.row_count}:{sync_state.version}'
             query = request.GET.get('q', '').strip()
-            if query:
-                # Simple case-insensitive search across all columns
-                mask = df.astype(str).apply(lambda x: x.str.contains(query, case=False, na=False)).any(axis=1)
-                df = df[mask]
-                
-
-            columns = df.columns.tolist()
-            df = df.iloc[::-1] # Reverse payload to show most recent at top
-            df = df.fillna('') # Replace NaN with empty string
             
-            # Handle Excel Download
+            # Handle Excel/CSV/NDJSON Download
             if request.GET.get('download') == 'true':
-                from django.http import HttpResponse
-                
-                # Create Excel file in memory
-                excel_buffer = io.BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Report')
-                
-                excel_buffer.seek(0)
-                response = HttpResponse(excel_buffer.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                response['Content-Disposition'] = 'attachment; filename="report.xlsx"'
-                return response
+                export_format = request.GET.get('format', 'xlsx')
+                if export_format not in EXPORT_FORMATS:
+                    export_format = 'xlsx'
+                return export_report(request, sync_state, query, export_format)
             
-            data_list = df.values.tolist()
+            # Filter logic if requested
+            if query:
+                paginator = Paginator(SearchResults(request.user, sync_state, query), 20)
+            else:
+                # Rows are ordered newest first by the model
+                rows = ReportRow.objects.filter(user=request.user).values_list('data', flat=True)
+                paginator = Paginator(rows, 20) # Show 20 contacts per page
             
             # Pagination
-            paginator = Paginator(data_list, 20) # Show 20 contacts per page
             page_number = request.GET.get('page')
             try:
                 page_obj = paginator.get_page(page_number)
@@ -96,61 +94,122 @@ def report_view(request):
         'columns': columns,
         'error': error,
         'query': request.GET.get('q', ''),
-        'google_sheet_id': sheet_id
+        'google_sheet_id': sheet_id,
+        'report_event_id': report_event_id,
     })
 
 
+def _report_data_etag(request, sheet_id, version):
+    """Strong ETag of a report_data_api response: sheet content version plus page/query"""
+    key = f"{request.user.pk}:{sheet_id}:{version}:{request.GET.get('page', '1')}:{request.GET.get('q', '').strip()}"
+    return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+
+def report_data_etag(request):
+    """
+    ETag for report_data_api computed before the view runs, from the cached
+    sheet version only. Returns None (view runs normally) when no fresh copy
+    of the sheet is cached, so the check never downloads or syncs anything.
+    """
+    if not request.user.is_authenticated:
+        return None
+    sheet_id = AIAgentConfig.objects.filter(user=request.user).values_list('google_sheet_id', flat=True).first()
+    version = fresh_report_version(sheet_id) if sheet_id else None
+    if version is None:
+        return None
+    return _report_data_etag(request, sheet_id, version)
+
+
 @login_required
+@condition(etag_func=report_data_etag)
 def report_data_api(request):
     """JSON API endpoint for auto-refreshing report table data"""
     from django.http import JsonResponse
 
-    ai_config, _ = AIAgentConfig.objects.get_or_create(user=request.user)
+    ai_config = request.user.get_ai_config()
     sheet_id = ai_config.google_sheet_id
 
     if not sheet_id:
         return JsonResponse({'error': 'No sheet ID configured'}, status=400)
 
     try:
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        response = requests.get(url)
-        response.raise_for_status()
-
-        df = pd.read_csv(io.BytesIO(response.content), encoding='utf-8')
+        sync_state = sync_report(request.user, sheet_id)
+        etag = _report_data_etag(request, sheet_id, sync_state.version)
+        # The pre-view check only runs while this worker's sheet copy is
+        # fresh; compare again with the synced version before building the body
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            patch_cache_control(not_modified, private=True, no_cache=True)
+            return not_modified
+        columns = sync_state.columns
 
         query = request.GET.get('q', '').strip()
         if query:
-            mask = df.astype(str).apply(lambda x: x.str.contains(query, case=False, na=False)).any(axis=1)
-            df = df[mask]
-
-        columns = df.columns.tolist()
-        df = df.iloc[::-1]
-        df = df.fillna('')
-        data_list = df.values.tolist()
+            results = SearchResults(request.user, sync_state, query)
+            total_records = results.count()
+        else:
+            total_records = sync_state.row_count
 
         # Pagination
         page_number = int(request.GET.get('page', 1))
         per_page = 20
-        total_pages = max(1, (len(data_list) + per_page - 1) // per_page)
+        total_pages = max(1, (total_records + per_page - 1) // per_page)
         page_number = min(page_number, total_pages)
         start = (page_number - 1) * per_page
         end = start + per_page
-        page_data = data_list[start:end]
 
-        return JsonResponse({
+        if query:
+            page_data = results[start:end]
+        else:
+            # Rows are ordered newest first by the model
+            page_data = list(ReportRow.objects.filter(user=request.user).values_list('data', flat=True)[start:end])
+
+        response = JsonResponse({
             'columns': columns,
             'data': page_data,
             'page': page_number,
             'total_pages': total_pages,
-            'total_records': len(data_list),
+            'total_records': total_records,
             'has_previous': page_number > 1,
             'has_next': page_number < total_pages,
         })
+        # Browsers revalidate every poll; unchanged sheets then cost a 304
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required
+async def report_events(request):
+    """
+    Server-sent events stream of new report rows. Needs the ASGI server
+    (userpanel_project.asgi, e.g. uvicorn): WSGI servers, runserver included,
+    buffer the whole stream before sending anything, so they get 204 No
+    Content instead and report.html polls report_data_api.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    ai_config = await AIAgentConfig.objects.filter(user=user).afirst()
+
+    if not ai_config or not ai_config.google_sheet_id:
+        return JsonResponse({'error': 'No sheet ID configured'}, status=400)
+
+    # EventSource sends Last-Event-ID when it reconnects
+    last_row, version = parse_event_id(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+
+    response = StreamingHttpResponse(
+        report_event_stream(user, ai_config.google_sheet_id, last_row, version),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 def register_view(request):
     """Handle user registration"""
@@ -224,7 +283,7 @@ def dashboard_view(request):
 @login_required
 def profile_view(request):
     """Display and update user profile"""
-    profile, created = UserProfile.objects.get_or_create(user=request.user)
+    profile = request.user.get_profile()
     
     if request.method == 'POST':
         if 'kyc_submit' in request.POST:
@@ -263,14 +322,10 @@ def profile_view(request):
 
 def privacy_policy_view(request, email_prefix):
     """Public privacy policy page for a user based on their email prefix"""
-    try:
-        user = CustomUser.objects.get(email__startswith=email_prefix + '@')
-    except CustomUser.DoesNotExist:
-        try:
-            user = CustomUser.objects.get(email=email_prefix)
-        except CustomUser.DoesNotExist:
-            from django.http import Http404
-            raise Http404("Privacy policy page not found.")
+    user = CustomUser.objects.get_by_email_prefix(email_prefix)
+    if user is None:
+        from django.http import Http404
+        raise Http404("Privacy policy page not found.")
 
     try:
         profile = UserProfile.objects.get(user=user)
@@ -296,7 +351,7 @@ def ai_agent_view(request):
     if not profile or profile.kyc_status != 'VERIFIED':
         return redirect('kyc_required')
     
-    ai_config, created = AIAgentConfig.objects.get_or_create(user=request.user)
+    ai_config = request.user.get_ai_config()
     
     if request.method == 'POST':
         form = AIAgentConfigForm(request.POST, instance=ai_config)
@@ -327,48 +382,62 @@ def ai_agent_view(request):
         'form': form,
         'webhook_url': webhook_url,
         'ai_config': ai_config,
+        'blocked_post_ids': ai_config.get_blocked_post_ids_list(),
         'subscription_active': subscription_active
     })
 
 
+@login_required
+def blocked_posts_api(request):
+    """JSON API endpoint adding or removing a single blocked post ID (AI agent auto-save)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    profile = getattr(request.user, 'profile', None)
+    if not profile or profile.kyc_status != 'VERIFIED':
+        return JsonResponse({'error': 'KYC verification required'}, status=403)
+
+    action = request.POST.get('action')
+    post_id = request.POST.get('post_id', '').strip()
+    if action not in ('add', 'remove'):
+        return JsonResponse({'error': 'Invalid action'}, status=400)
+    if not post_id or len(post_id) > 255:
+        return JsonResponse({'error': 'Please provide a valid Post ID.'}, status=400)
+
+    ai_config = request.user.get_ai_config()
+    if action == 'add':
+        BlockedPost.objects.get_or_create(config=ai_config, post_id=post_id)
+    else:
+        # Delete through the instances so the config cache signal fires
+        for blocked in BlockedPost.objects.filter(config=ai_config, post_id=post_id):
+            blocked.delete()
+
+    return JsonResponse({'status': 'success', 'action': action, 'post_id': post_id})
+
+
 @login_required
 def feed_view(request):
     """Display Facebook Page feed (posts) using the Graph API"""
     page_name = None
     posts = []
+    next_page = None
     error = None
 
     try:
-        ai_config = AIAgentConfig.objects.get(user=request.user)
+        ai_config = request.user.ai_config
         page_id = ai_config.facebook_page_id
         access_token = ai_config.facebook_page_api
 
         if not page_id or not access_token:
             error = 'Facebook Page ID or API key is missing. Please configure your AI Agent first.'
         else:
-            # Fetch page name
             try:
-                name_resp = requests.get(
-                    f"https://graph.facebook.com/v24.0/{page_id}",
-                    params={'fields': 'name', 'access_token': access_token}
-                )
-                if name_resp.status_code == 200:
-                    page_name = name_resp.json().get('name', 'Unknown Page')
-            except Exception:
-                page_name = 'Unknown Page'
-
-            # Fetch page feed
-            feed_resp = requests.get(
-                f"https://graph.facebook.com/v24.0/{page_id}/feed",
-                params={'access_token': access_token, 'fields': 'id,message,created_time,full_picture,permalink_url'}
-            )
-
-            if feed_resp.status_code == 200:
-                feed_data = feed_resp.json()
-                posts = feed_data.get('data', [])
-            else:
-                err_data = feed_resp.json()
-                error = err_data.get('error', {}).get('message', 'Failed to fetch feed.')
+                feed = get_page_feed(page_id, access_token)
+                page_name = feed['name']
+                posts = feed['posts']
+                next_page = next_cursor(feed['paging'])
+            except GraphError as e:
+                error = str(e)
 
     except AIAgentConfig.DoesNotExist:
         error = 'AI Agent configuration not found. Please set it up first.'
@@ -378,10 +447,37 @@ def feed_view(request):
     return render(request, 'accounts/feed.html', {
         'page_name': page_name,
         'posts': posts,
+        'next_page': next_page,
         'error': error,
     })
 
 
+@login_required
+def feed_more_api(request):
+    """JSON API endpoint returning the next page of feed posts for infinite scroll"""
+    after = request.GET.get('after', '').strip()
+    if not after:
+        return JsonResponse({'error': 'Missing paging cursor'}, status=400)
+
+    ai_config = request.user.get_ai_config()
+    page_id = ai_config.facebook_page_id
+    access_token = ai_config.facebook_page_api
+    if not page_id or not access_token:
+        return JsonResponse({'error': 'Facebook Page ID or API key is missing'}, status=400)
+
+    try:
+        page = get_feed_page(page_id, access_token, after)
+    except GraphError as e:
+        return JsonResponse({'error': str(e)}, status=502)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({
+        'html': render_to_string('accounts/feed_posts.html', {'posts': page['posts']}, request=request),
+        'next': next_cursor(page['paging']),
+    })
+
+
 @login_required
 def create_post_view(request):
     """Create a post on the user's Facebook Page using the Graph API"""
@@ -394,7 +490,7 @@ def create_post_view(request):
             return redirect('feed')
 
         try:
-            ai_config = AIAgentConfig.objects.get(user=request.user)
+            ai_config = request.user.ai_config
             page_id = ai_config.facebook_page_id
             access_token = ai_config.facebook_page_api
 
@@ -404,19 +500,25 @@ def create_post_view(request):
 
             if image:
                 # Photo post: POST /{page_id}/photos
-                url = f"https://graph.facebook.com/v24.0/{page_id}/photos"
-                files = {'source': (image.name, image.read(), image.content_type)}
+                url = f"{GRAPH_API_URL}/{page_id}/photos"
                 data = {'access_token': access_token}
                 if message:
                     data['caption'] = message
-                response = requests.post(url, data=data, files=files)
+                source, filename, content_type = prepare_image(image)
+                try:
+                    body = MultipartFile(data, 'source', filename, source, content_type)
+                    response = http_client.post(url, data=body, headers={'Content-Type': body.content_type})
+                finally:
+                    if source is not image:
+                        source.close()
             else:
                 # Text-only post: POST /{page_id}/feed
-                url = f"https://graph.facebook.com/v24.0/{page_id}/feed"
+                url = f"{GRAPH_API_URL}/{page_id}/feed"
                 data = {'message': message, 'access_token': access_token}
-                response = requests.post(url, data=data)
+                response = http_client.post(url, data=data)
 
             if response.status_code == 200:
+                invalidate_page_feed(page_id, access_token)
                 messages.success(request, 'Post published successfully!')
             else:
                 err_data = response.json()
@@ -444,7 +546,7 @@ def delete_comment_view(request):
             
         try:
             # Get user's AI config for the access token
-            ai_config = AIAgentConfig.objects.get(user=request.user)
+            ai_config = request.user.ai_config
             access_token = ai_config.facebook_page_api
             
             if not access_token:
@@ -452,8 +554,8 @@ def delete_comment_view(request):
                 return redirect('ai_agent')
             
             # Call Facebook Graph API
-            url = f"https://graph.facebook.com/v24.0/{comment_id}?access_token={access_token}"
-            response = requests.delete(url)
+            url = f"{GRAPH_API_URL}/{comment_id}"
+            response = http_client.delete(url, params={'access_token': access_token})
             
             if response.status_code == 200:
                 messages.success(request, f'Comment {comment_id} deleted successfully!')
@@ -471,6 +573,32 @@ def delete_comment_view(request):
     return redirect('report')
 
 
+@login_required
+def bulk_delete_comments_api(request):
+    """JSON API endpoint deleting many Facebook comments through Graph batch requests"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    comment_ids = parse_comment_ids(request.POST.get('comment_ids', ''))
+    if not comment_ids:
+        return JsonResponse({'error': 'Please provide at least one Comment ID.'}, status=400)
+    if len(comment_ids) > MAX_BULK_DELETE:
+        return JsonResponse({'error': f'At most {MAX_BULK_DELETE} comments can be deleted at once.'}, status=400)
+
+    ai_config = request.user.get_ai_config()
+    access_token = ai_config.facebook_page_api
+    if not access_token:
+        return JsonResponse({'error': 'Facebook Page API token is missing. Please configure your AI agent first.'}, status=400)
+
+    results = delete_comments(comment_ids, access_token)
+    deleted = sum(1 for result in results if result['deleted'])
+    return JsonResponse({
+        'results': results,
+        'deleted': deleted,
+        'failed': len(results) - deleted,
+    })
+
+
 @login_required
 def kyc_required_view(request):
     """Display KYC required page when user hasn't completed verification"""
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from django.conf.global_settings import LANGUAGES as DJANGO_LANGUAGES
 
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +65,8 @@ ROOT_URLCONF = 'userpanel_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render times to accounts.instrumentation
+        'BACKEND': 'accounts.instrumentation.InstrumentedTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -90,6 +93,35 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared by all worker processes on the host, so invalidations made by one
+# worker (e.g. config API versions bumped on save) are seen by the others.
+# Each merchant keeps a dozen or so keys (config version, payload, ETags per
+# field, feed pages), plus a few global ones (admin stats, instrumentation).
+# The file cache lists its directory on every write and, once MAX_ENTRIES is
+# reached, deletes 1/CULL_FREQUENCY of the entries at random, so size it well
+# above the key count. Set REDIS_URL (needs the redis package) to use Redis
+# instead, e.g. when the workers run on several hosts.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / '.django_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 50000)),
+                'CULL_FREQUENCY': 10,
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -135,6 +167,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Custom user model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# IdentityBackend loads request.user with its profile and AI config in one
+# query. ModelBackend stays listed so sessions created before it keep working.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.IdentityBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -146,6 +185,60 @@ LOGOUT_REDIRECT_URL = 'login'
 # API Admin Password (for accessing user AI config via API)
 API_ADMIN_PASSWORD = 'metasoul1$'
 
+# Report cache: seconds a downloaded Google Sheet is reused, and the total
+# memory the parsed sheets may occupy before least recently used ones are dropped
+REPORT_CACHE_TTL = 60
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Outbound API base URLs. Point both at `python manage.py api_standin` to run
+# the report and feed paths against a local stand-in (offline / load tests)
+GRAPH_API_BASE = os.environ.get('GRAPH_API_BASE', 'https://graph.facebook.com/v24.0')
+GOOGLE_SHEETS_BASE = os.environ.get('GOOGLE_SHEETS_BASE', 'https://docs.google.com')
+
+# Outbound HTTP (Google Sheets, Facebook Graph API): (connect, read) timeout in
+# seconds, retries for idempotent calls, and keep-alive connections per host
+OUTBOUND_HTTP_TIMEOUT = (5, 20)
+OUTBOUND_HTTP_RETRIES = 2
+OUTBOUND_HTTP_POOL_SIZE = 10
+
+# Facebook feed cache: seconds a feed is served fresh, extra seconds it is
+# served stale while refreshing in the background, and page name lifetime
+FEED_CACHE_TTL = 60
+FEED_CACHE_STALE = 600
+PAGE_NAME_CACHE_TTL = 24 * 60 * 60
+
+# Bulk comment deletion: concurrent Graph batch calls (50 deletes each) and
+# the most comment IDs accepted per request
+GRAPH_BATCH_WORKERS = 4
+MAX_BULK_DELETE = 1000
+
+# Post photos above these limits are downscaled and re-encoded as JPEG
+# before upload, by a pool of IMAGE_UPLOAD_WORKERS threads
+IMAGE_UPLOAD_MAX_DIMENSION = 2048
+IMAGE_UPLOAD_MAX_BYTES = 4 * 1024 * 1024
+IMAGE_UPLOAD_WORKERS = 2
+
+# Live report server-sent events (served by userpanel_project.asgi): seconds
+# between sheet checks, and how long a stream stays open before reconnecting
+REPORT_EVENTS_INTERVAL = 15
+REPORT_EVENTS_MAX_AGE = 300
+
+# Per-view request stats (portal/admin/stats/): on/off, and seconds between
+# merges of each process's histograms into the shared cache
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_FLUSH_INTERVAL = 30
+
+# Seconds the admin dashboard and subscription counters are cached (they are
+# also dropped whenever a user, profile or AI config changes)
+ADMIN_STATS_TTL = 60
+
+# Config change webhooks: config, KYC and subscription changes are recorded in
+# an outbox and POSTed in batches to this URL by `manage.py dispatch_config_events`.
+# Nothing is recorded while it is empty. Requests are signed with the secret
+# (X-Signature-256 header, HMAC-SHA256 of the body) when one is set.
+CONFIG_WEBHOOK_URL = os.environ.get('CONFIG_WEBHOOK_URL', '')
+CONFIG_WEBHOOK_SECRET = os.environ.get('CONFIG_WEBHOOK_SECRET', '')
+
 # Email Configuration (Console Backend for Development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'localhost'